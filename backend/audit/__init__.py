@@ -0,0 +1,8 @@
+"""Audit logging package."""
+
+from audit.archive import audit_archive, AuditArchive
+from audit.storage import audit_storage, AuditStorage
+from audit.writer import audit_writer, AuditWriter
+from audit.export import audit_exporter, AuditExporter
+
+__all__ = ["audit_archive", "AuditArchive", "audit_storage", "AuditStorage", "audit_writer", "AuditWriter", "audit_exporter", "AuditExporter"]
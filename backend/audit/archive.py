@@ -0,0 +1,363 @@
+"""
+Cold-tier archive of audit log partitions.
+
+Day partitions that age out of the hot retention window are written to
+immutable segment files on local disk before they are dropped:
+
+- ``audit-YYYYMMDD.seg``: rows sorted by (vid_hash, timestamp), in
+  zlib-compressed blocks of JSON lines
+- ``audit-YYYYMMDD.idx``: sidecar index, memory-mapped for lookups
+
+Index layout (big-endian)::
+
+    header   magic "VIDX", version, entry count, block count
+    entries  (vid_hash as 32 raw bytes, block number), sorted by vid_hash
+    blocks   (offset, length, rows, min timestamp us, max timestamp us)
+
+A lookup binary-searches the mmapped entries and decompresses only the
+blocks holding that vid_hash, so no segment is ever loaded whole. The
+index is renamed into place last and marks the segment as complete.
+"""
+
+import asyncio
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+import zlib
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import List, Optional
+
+from sqlalchemy import Table, select
+
+from config import settings
+from database import read_engine
+from models.audit_log import AuditAction
+
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_VERSION = 1
+_INDEX_HEADER = struct.Struct(">4sB3xQI")
+_INDEX_ENTRY = struct.Struct(">32sI")
+_BLOCK_ENTRY = struct.Struct(">QIIqq")
+_INDEX_MAGIC = b"VIDX"
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def _micros(timestamp: datetime) -> int:
+    return (timestamp - _EPOCH) // timedelta(microseconds=1)
+
+
+class Segment:
+    """
+    Read-only view of one archived day, backed by two mmaps.
+    """
+
+    def __init__(self, data_path: Path, index_path: Path):
+        with open(index_path, "rb") as f:
+            self._index = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        with open(data_path, "rb") as f:
+            self._data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, self.entry_count, self.block_count = _INDEX_HEADER.unpack_from(self._index, 0)
+        if magic != _INDEX_MAGIC or version != SEGMENT_VERSION:
+            self.close()
+            raise ValueError(f"Unsupported audit segment index: {index_path}")
+
+        self._entries_at = _INDEX_HEADER.size
+        self._blocks_at = self._entries_at + self.entry_count * _INDEX_ENTRY.size
+
+    def _entry(self, position: int):
+        return _INDEX_ENTRY.unpack_from(self._index, self._entries_at + position * _INDEX_ENTRY.size)
+
+    def blocks_for(self, key: bytes) -> List[int]:
+        """Blocks holding rows for a raw 32-byte vid_hash (binary search)."""
+        low, high = 0, self.entry_count
+        while low < high:
+            middle = (low + high) // 2
+            if self._entry(middle)[0] < key:
+                low = middle + 1
+            else:
+                high = middle
+
+        blocks = []
+        while low < self.entry_count:
+            entry_key, block = self._entry(low)
+            if entry_key != key:
+                break
+            blocks.append(block)
+            low += 1
+        return blocks
+
+    def read_block(self, block: int, since_us: Optional[int], until_us: Optional[int]) -> List[list]:
+        """Decode one block, or return nothing if it misses the time range."""
+        offset, length, _, min_us, max_us = _BLOCK_ENTRY.unpack_from(
+            self._index, self._blocks_at + block * _BLOCK_ENTRY.size
+        )
+        if (since_us is not None and max_us < since_us) or (until_us is not None and min_us >= until_us):
+            return []
+
+        payload = zlib.decompress(self._data[offset:offset + length])
+        return [json.loads(line) for line in payload.splitlines()]
+
+    def close(self):
+        self._index.close()
+        self._data.close()
+
+
+class AuditArchive:
+    """
+    Writes audit partitions to segment files and searches them.
+    """
+
+    def __init__(self, directory: str, block_rows: int, max_open_segments: int = 32, enabled: bool = True):
+        self.enabled = enabled
+        self.directory = Path(directory)
+        self.block_rows = max(1, block_rows)
+        self.max_open_segments = max(1, max_open_segments)
+
+        self._open: "OrderedDict[date, Segment]" = OrderedDict()
+        # Searches run in worker threads and share the open segments
+        self._lock = threading.Lock()
+
+        # Counters
+        self.segments_written = 0
+        self.rows_archived = 0
+        self.bytes_written = 0
+        self.lookups = 0
+        self.blocks_read = 0
+
+    def paths(self, day: date):
+        """(data, index) paths of a day's segment."""
+        stem = f"audit-{day:%Y%m%d}"
+        return self.directory / f"{stem}.seg", self.directory / f"{stem}.idx"
+
+    def has_segment(self, day: date) -> bool:
+        return self.paths(day)[1].exists()
+
+    def days(self) -> List[date]:
+        """Days with a complete segment, oldest first."""
+        if not self.directory.is_dir():
+            return []
+
+        days = []
+        for path in self.directory.glob("audit-*.idx"):
+            try:
+                days.append(datetime.strptime(path.stem[len("audit-"):], "%Y%m%d").date())
+            except ValueError:
+                continue
+        return sorted(days)
+
+    async def archive_partition(self, day: date, table: Table) -> int:
+        """
+        Write every row of a day partition to that day's segment.
+
+        Segments are immutable: if one already exists for the day (e.g. an
+        earlier run archived it but failed to drop the partition), it is
+        kept and nothing is rewritten.
+
+        Returns:
+            Rows archived
+        """
+        if self.has_segment(day):
+            return 0
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        data_path, index_path = self.paths(day)
+        data_tmp = data_path.with_suffix(".seg.tmp")
+        index_tmp = index_path.with_suffix(".idx.tmp")
+
+        query = (
+            select(table.c.id, table.c.timestamp, table.c.action, table.c.vid_hash, table.c.ip_hash, table.c.result)
+            .order_by(table.c.vid_hash, table.c.timestamp, table.c.id)
+            .execution_options(yield_per=self.block_rows)
+        )
+
+        writer = _SegmentWriter(data_tmp, index_tmp)
+        try:
+            async with read_engine.connect() as conn:
+                result = await conn.stream(query)
+                async for chunk in result.partitions():
+                    await asyncio.to_thread(writer.write_block, chunk)
+            await asyncio.to_thread(writer.finish)
+        except BaseException:
+            writer.abort()
+            raise
+
+        if writer.rows == 0:
+            writer.abort()
+            return 0
+
+        # Index last: a segment without its index is never read
+        os.replace(data_tmp, data_path)
+        os.replace(index_tmp, index_path)
+
+        self.segments_written += 1
+        self.rows_archived += writer.rows
+        self.bytes_written += writer.bytes
+        logger.info("Archived %d audit rows for %s (%d bytes)", writer.rows, day, writer.bytes)
+        return writer.rows
+
+    def _segment(self, day: date) -> Segment:
+        segment = self._open.get(day)
+        if segment is not None:
+            self._open.move_to_end(day)
+            return segment
+
+        segment = Segment(*self.paths(day))
+        self._open[day] = segment
+        while len(self._open) > self.max_open_segments:
+            _, evicted = self._open.popitem(last=False)
+            evicted.close()
+        return segment
+
+    def _search(self, vid_hash: str, since: Optional[datetime], until: Optional[datetime], limit: int) -> List[dict]:
+        key = bytes.fromhex(vid_hash)
+        since_us = _micros(since) if since is not None else None
+        until_us = _micros(until) if until is not None else None
+
+        rows = []
+        for day in self.days():
+            if since is not None and day < since.date():
+                continue
+            if until is not None and datetime.combine(day, datetime.min.time()) >= until:
+                continue
+
+            segment = self._segment(day)
+            for block in segment.blocks_for(key):
+                self.blocks_read += 1
+                for id, timestamp, action, row_hash, ip_hash, result in segment.read_block(block, since_us, until_us):
+                    if row_hash != vid_hash:
+                        continue
+                    timestamp = datetime.fromisoformat(timestamp)
+                    if (since is not None and timestamp < since) or (until is not None and timestamp >= until):
+                        continue
+                    rows.append({
+                        "id": id,
+                        "timestamp": timestamp,
+                        "action": AuditAction(action),
+                        "vid_hash": row_hash,
+                        "ip_hash": ip_hash,
+                        "result": result
+                    })
+                    if len(rows) >= limit:
+                        return rows
+        return rows
+
+    async def search(
+        self,
+        vid_hash: str,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        limit: int = 1000
+    ) -> List[dict]:
+        """
+        Archived rows for a vid_hash with ``since <= timestamp < until``,
+        oldest day first.
+        """
+        if not self.enabled:
+            return []
+
+        self.lookups += 1
+        return await asyncio.to_thread(self._locked_search, vid_hash, since, until, limit)
+
+    def _locked_search(self, *args) -> List[dict]:
+        with self._lock:
+            return self._search(*args)
+
+    def close(self):
+        """Unmap every open segment."""
+        with self._lock:
+            while self._open:
+                _, segment = self._open.popitem()
+                segment.close()
+
+    def stats(self) -> dict:
+        """Snapshot of archive size and lookup counters."""
+        return {
+            "enabled": self.enabled,
+            "segments": len(self.days()),
+            "segments_written": self.segments_written,
+            "rows_archived": self.rows_archived,
+            "bytes_written": self.bytes_written,
+            "lookups": self.lookups,
+            "blocks_read": self.blocks_read
+        }
+
+
+class _SegmentWriter:
+    """
+    Streams sorted rows into a segment's data and index files.
+
+    Index entries are written as they are produced (rows arrive sorted by
+    vid_hash); only the small block table is held in memory.
+    """
+
+    def __init__(self, data_path: Path, index_path: Path):
+        self.data_path = data_path
+        self.index_path = index_path
+        self._data = open(data_path, "wb")
+        self._index = open(index_path, "wb")
+        self._index.write(b"\0" * _INDEX_HEADER.size)
+
+        self._blocks = []
+        self._entries = 0
+        self._last_key = None
+        self.rows = 0
+        self.bytes = 0
+
+    def write_block(self, rows):
+        block = len(self._blocks)
+        lines = []
+        min_us = max_us = None
+
+        for id, timestamp, action, vid_hash, ip_hash, result in rows:
+            lines.append(json.dumps([id, timestamp.isoformat(), action.value, vid_hash, ip_hash, result]))
+
+            stamp = _micros(timestamp)
+            min_us = stamp if min_us is None else min(min_us, stamp)
+            max_us = stamp if max_us is None else max(max_us, stamp)
+
+            key = (bytes.fromhex(vid_hash), block)
+            if key != self._last_key:
+                self._index.write(_INDEX_ENTRY.pack(*key))
+                self._entries += 1
+                self._last_key = key
+
+        payload = zlib.compress("\n".join(lines).encode(), 6)
+        self._blocks.append((self._data.tell(), len(payload), len(lines), min_us, max_us))
+        self._data.write(payload)
+        self.rows += len(lines)
+
+    def finish(self):
+        for block in self._blocks:
+            self._index.write(_BLOCK_ENTRY.pack(*block))
+        self._index.seek(0)
+        self._index.write(_INDEX_HEADER.pack(_INDEX_MAGIC, SEGMENT_VERSION, self._entries, len(self._blocks)))
+
+        for f in (self._data, self._index):
+            f.flush()
+            os.fsync(f.fileno())
+        self.bytes = self._data.tell() + self._index.seek(0, os.SEEK_END)
+        self._data.close()
+        self._index.close()
+
+    def abort(self):
+        self._data.close()
+        self._index.close()
+        for path in (self.data_path, self.index_path):
+            path.unlink(missing_ok=True)
+
+
+# Global audit archive instance
+audit_archive = AuditArchive(
+    directory=settings.audit_archive_dir,
+    block_rows=settings.audit_archive_block_rows,
+    enabled=settings.audit_archive_enabled
+)
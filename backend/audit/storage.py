@@ -0,0 +1,444 @@
+"""
+Day-partitioned audit log storage.
+
+Verification traffic makes the audit log the largest table by far, and
+row-level DELETEs for retention would be as expensive as the inserts. Rows
+are therefore stored one day per partition:
+
+- PostgreSQL: native range partitions of ``audit_logs``
+  (``audit_logs_pYYYYMMDD``, plus ``audit_logs_default`` as a catch-all)
+- SQLite: rotated ``audit_logs_pYYYYMMDD`` tables, created on first write
+
+Retention drops whole partitions, after writing them to the cold-tier
+archive (``audit.archive``). Every written batch also bumps a
+per-minute ``audit_rollups`` count by action, so dashboards never scan
+raw events.
+"""
+
+import asyncio
+import logging
+import re
+from collections import Counter, defaultdict
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Set
+
+from sqlalchemy import Column, Index, Integer, MetaData, Table, select, delete, insert, text
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.schema import CreateIndex, CreateTable
+
+from config import settings
+from database import engine, read_engine
+from models.audit_log import AuditLog, AuditRollup
+from audit.archive import audit_archive
+from serving import maintenance_lock
+
+
+logger = logging.getLogger(__name__)
+
+PARTITION_PREFIX = "audit_logs_p"
+_PARTITION_NAME = re.compile(r"^audit_logs_p(\d{8})$")
+
+# Upserts for the rollup counters, by dialect
+_UPSERTS = {
+    "postgresql": postgresql_insert,
+    "sqlite": sqlite_insert,
+}
+
+# Rotated SQLite partitions (kept out of Base.metadata so create_all ignores them)
+_partition_metadata = MetaData()
+
+
+def partition_name(day: date) -> str:
+    """Name of the partition holding a day's audit rows."""
+    return f"{PARTITION_PREFIX}{day:%Y%m%d}"
+
+
+def partition_day(name: str) -> Optional[date]:
+    """Day a partition name covers, or None if it is not a day partition."""
+    match = _PARTITION_NAME.match(name)
+    if match is None:
+        return None
+    return datetime.strptime(match.group(1), "%Y%m%d").date()
+
+
+def partition_id_base(day: date) -> int:
+    """
+    First id of a rotated partition's range, so ids stay unique across
+    days: each day gets 2**32 ids, numbered from its day since 1970.
+    """
+    return (day - date(1970, 1, 1)).days << 32
+
+
+def partition_table(name: str) -> Table:
+    """
+    Table object for a rotated SQLite partition.
+
+    Same columns and indexes as ``audit_logs``. ``id`` is an AUTOINCREMENT
+    rowid, seeded at creation to the day's range (``partition_id_base``).
+    """
+    table = _partition_metadata.tables.get(name)
+    if table is not None:
+        return table
+
+    columns = [Column("id", Integer, primary_key=True)]
+    for column in AuditLog.__table__.columns:
+        if column.name == "id":
+            continue
+        copy = column._copy()
+        copy.primary_key = False
+        columns.append(copy)
+
+    # Composite indexes (single-column ones come with the column copies),
+    # renamed for the partition
+    indexes = [
+        Index(index.name.replace(AuditLog.__tablename__, name, 1), *(column.name for column in index.columns))
+        for index in AuditLog.__table__.indexes
+        if len(index.columns) > 1
+    ]
+
+    return Table(name, _partition_metadata, *columns, *indexes, sqlite_autoincrement=True)
+
+
+class AuditStorage:
+    """
+    Writes audit batches into day partitions and maintains them.
+
+    ``mode`` is "native" (PostgreSQL partitions), "rotated" (SQLite tables)
+    or "single" (a plain ``audit_logs`` table, e.g. one created before
+    partitioning on PostgreSQL, which is left as is).
+    """
+
+    def __init__(
+        self,
+        retention_days: int,
+        premake_days: int,
+        rollup_retention_days: int,
+        interval: float
+    ):
+        self.retention_days = retention_days
+        self.premake_days = max(1, premake_days)
+        self.rollup_retention_days = rollup_retention_days
+        self.interval = interval
+
+        dialect = engine.dialect.name
+        self.mode = {"postgresql": "native", "sqlite": "rotated"}.get(dialect, "single")
+        self._upsert = _UPSERTS.get(dialect)
+
+        self._known: Set[str] = set()
+        self._task: Optional[asyncio.Task] = None
+
+        # Counters
+        self.partitions_created = 0
+        self.partitions_dropped = 0
+        self.rollup_rows = 0
+        self.last_maintenance_at: Optional[datetime] = None
+
+    async def prepare(self):
+        """
+        Check the table layout and run maintenance once (in the worker
+        running maintenance). Call at startup, after ``init_db`` and before
+        the audit writer starts.
+        """
+        if self.mode == "native":
+            async with engine.connect() as conn:
+                partitioned = await conn.scalar(text(
+                    "SELECT 1 FROM pg_partitioned_table"
+                    " WHERE partrelid = 'audit_logs'::regclass"
+                ))
+            if not partitioned:
+                logger.warning(
+                    "audit_logs is not a partitioned table (created before "
+                    "partitioning); writing to it unpartitioned, retention disabled"
+                )
+                self.mode = "single"
+
+        if maintenance_lock.held():
+            await self.maintain()
+
+    def start(self):
+        """Start the periodic maintenance task."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        """Cancel the maintenance task."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _loop(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            # With several workers only the maintenance lock holder runs this
+            if not maintenance_lock.held():
+                continue
+            try:
+                await self.maintain()
+            except Exception:
+                logger.exception("Audit partition maintenance failed")
+
+    async def write(self, conn, events: List[dict]):
+        """
+        Insert a batch of audit events and bump their rollup counts.
+
+        Runs on the caller's connection so events and rollups commit (or
+        roll back) with the caller's transaction.
+
+        Args:
+            conn: AsyncConnection inside a transaction
+            events: AuditLog column dicts (``timestamp`` is required)
+        """
+        if not events:
+            return
+
+        if self.mode == "rotated":
+            by_day: Dict[date, List[dict]] = defaultdict(list)
+            for event in events:
+                by_day[event["timestamp"].date()].append(event)
+            for day, rows in by_day.items():
+                table = await self._ensure_rotated(conn, partition_name(day))
+                await conn.execute(insert(table), rows)
+        else:
+            await conn.execute(insert(AuditLog), events)
+
+        await self._bump_rollups(conn, events)
+
+    async def _ensure_rotated(self, conn, name: str) -> Table:
+        table = partition_table(name)
+        if name not in self._known:
+            await conn.run_sync(_create_rotated, table)
+            self._known.add(name)
+            self.partitions_created += 1
+        return table
+
+    async def _bump_rollups(self, conn, events: List[dict]):
+        if self._upsert is None:
+            return
+
+        counts = Counter(
+            (event["timestamp"].replace(second=0, microsecond=0), event["action"])
+            for event in events
+        )
+        stmt = self._upsert(AuditRollup)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[AuditRollup.minute, AuditRollup.action],
+            set_={"count": AuditRollup.count + stmt.excluded.count}
+        )
+        await conn.execute(stmt, [
+            {"minute": minute, "action": action, "count": count}
+            for (minute, action), count in counts.items()
+        ])
+        self.rollup_rows += len(counts)
+
+    async def partitions(self, conn) -> List[date]:
+        """Days that currently have a partition, oldest first."""
+        if self.mode == "native":
+            result = await conn.execute(text(
+                "SELECT c.relname FROM pg_inherits i"
+                " JOIN pg_class c ON c.oid = i.inhrelid"
+                " WHERE i.inhparent = 'audit_logs'::regclass"
+            ))
+        elif self.mode == "rotated":
+            result = await conn.execute(text(
+                "SELECT name FROM sqlite_master WHERE type = 'table'"
+                " AND name LIKE 'audit_logs_p%'"
+            ))
+        else:
+            return []
+
+        days = [partition_day(name) for (name,) in result.all()]
+        return sorted(day for day in days if day is not None)
+
+    async def tables(
+        self,
+        conn,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None
+    ) -> List[Table]:
+        """
+        Tables to read for audit rows with ``since <= timestamp < until``.
+
+        PostgreSQL prunes partitions itself, so this is just ``audit_logs``
+        there. On SQLite it is the legacy ``audit_logs`` table followed by
+        the overlapping day tables, oldest first.
+        """
+        if self.mode != "rotated":
+            return [AuditLog.__table__]
+
+        tables = [AuditLog.__table__]
+        for day in await self.partitions(conn):
+            if since is not None and day < since.date():
+                continue
+            if until is not None and datetime.combine(day, datetime.min.time()) >= until:
+                continue
+            tables.append(partition_table(partition_name(day)))
+        return tables
+
+    async def maintain(self, now: Optional[datetime] = None) -> dict:
+        """
+        Create upcoming partitions, archive and drop expired ones, prune
+        old rollups.
+
+        Returns:
+            Summary of partitions created and dropped
+        """
+        today = (now or datetime.utcnow()).date()
+        created, dropped = [], []
+
+        async with engine.begin() as conn:
+            if self.mode == "native":
+                await conn.execute(text(
+                    "CREATE TABLE IF NOT EXISTS audit_logs_default PARTITION OF audit_logs DEFAULT"
+                ))
+                existing = set(await self.partitions(conn))
+                for offset in range(self.premake_days + 1):
+                    day = today + timedelta(days=offset)
+                    if day in existing:
+                        continue
+                    await conn.execute(text(
+                        f"CREATE TABLE IF NOT EXISTS {partition_name(day)} PARTITION OF audit_logs"
+                        f" FOR VALUES FROM ('{day.isoformat()}') TO ('{(day + timedelta(days=1)).isoformat()}')"
+                    ))
+                    created.append(day)
+            elif self.mode == "rotated":
+                # Later days are created by the first write that needs them
+                name = partition_name(today)
+                if name not in self._known:
+                    await self._ensure_rotated(conn, name)
+                    created.append(today)
+
+        if self.retention_days > 0:
+            cutoff = today - timedelta(days=self.retention_days)
+            async with engine.connect() as conn:
+                expired = [day for day in await self.partitions(conn) if day < cutoff]
+
+            for day in expired:
+                name = partition_name(day)
+                if audit_archive.enabled:
+                    # Archive outside any write transaction; keep the
+                    # partition if archiving fails so nothing is lost
+                    try:
+                        await audit_archive.archive_partition(day, partition_table(name))
+                    except Exception:
+                        logger.exception("Failed to archive audit partition %s, keeping it", name)
+                        break
+
+                async with engine.begin() as conn:
+                    await conn.execute(text(f"DROP TABLE IF EXISTS {name}"))
+                self._known.discard(name)
+                dropped.append(day)
+
+        if self.rollup_retention_days > 0:
+            async with engine.begin() as conn:
+                await conn.execute(
+                    delete(AuditRollup).where(
+                        AuditRollup.minute < datetime.combine(
+                            today - timedelta(days=self.rollup_retention_days),
+                            datetime.min.time()
+                        )
+                    )
+                )
+
+        if self.mode == "native":
+            self.partitions_created += len(created)
+        self.partitions_dropped += len(dropped)
+        self.last_maintenance_at = datetime.utcnow()
+        if dropped:
+            logger.info("Dropped %d expired audit partitions", len(dropped))
+
+        return {
+            "created": [day.isoformat() for day in created],
+            "dropped": [day.isoformat() for day in dropped]
+        }
+
+    async def search(
+        self,
+        vid_hash: str,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        limit: int = 1000
+    ) -> List[dict]:
+        """
+        Hot-tier rows for a vid_hash with ``since <= timestamp < until``,
+        oldest first.
+        """
+        rows = []
+        async with read_engine.connect() as conn:
+            for table in await self.tables(conn, since, until):
+                query = select(
+                    table.c.id, table.c.timestamp, table.c.action,
+                    table.c.vid_hash, table.c.ip_hash, table.c.result
+                ).where(table.c.vid_hash == vid_hash)
+                if since is not None:
+                    query = query.where(table.c.timestamp >= since)
+                if until is not None:
+                    query = query.where(table.c.timestamp < until)
+                query = query.order_by(table.c.timestamp, table.c.id).limit(limit - len(rows))
+
+                result = await conn.execute(query)
+                rows.extend(row._asdict() for row in result.all())
+                if len(rows) >= limit:
+                    break
+        return rows
+
+    async def rollups(self, since: datetime, until: Optional[datetime] = None) -> List[dict]:
+        """Per-minute counts by action with ``since <= minute < until``."""
+        query = select(AuditRollup.minute, AuditRollup.action, AuditRollup.count).where(
+            AuditRollup.minute >= since
+        )
+        if until is not None:
+            query = query.where(AuditRollup.minute < until)
+
+        async with engine.connect() as conn:
+            result = await conn.execute(query.order_by(AuditRollup.minute, AuditRollup.action))
+            return [
+                {"minute": minute, "action": action, "count": count}
+                for minute, action, count in result.all()
+            ]
+
+    def stats(self) -> dict:
+        """Snapshot of partition and rollup counters."""
+        return {
+            "mode": self.mode,
+            "retention_days": self.retention_days,
+            "partitions_created": self.partitions_created,
+            "partitions_dropped": self.partitions_dropped,
+            "rollup_rows": self.rollup_rows,
+            "last_maintenance_at": self.last_maintenance_at.isoformat() if self.last_maintenance_at else None
+        }
+
+
+def _create_rotated(sync_conn, table: Table):
+    # Partitions created before id ranges existed are left as they are
+    existed = sync_conn.dialect.has_table(sync_conn, table.name)
+
+    # IF NOT EXISTS so concurrent workers can race on the same day
+    sync_conn.execute(CreateTable(table, if_not_exists=True))
+    for index in table.indexes:
+        sync_conn.execute(CreateIndex(index, if_not_exists=True))
+    if existed:
+        return
+
+    # Start the day's ids at its range; AUTOINCREMENT continues from the
+    # larger of this and the highest id, so a seed never reuses ids
+    sync_conn.execute(
+        text(
+            "INSERT INTO sqlite_sequence (name, seq) SELECT :name, :seq"
+            " WHERE NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = :name)"
+        ),
+        {"name": table.name, "seq": partition_id_base(partition_day(table.name))}
+    )
+
+
+# Global audit storage instance
+audit_storage = AuditStorage(
+    retention_days=settings.audit_retention_days,
+    premake_days=settings.audit_partition_premake_days,
+    rollup_retention_days=settings.audit_rollup_retention_days,
+    interval=settings.audit_maintenance_interval_seconds
+)
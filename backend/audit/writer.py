@@ -0,0 +1,185 @@
+"""
+Write-behind audit log writer.
+
+Routes append audit events to a bounded in-memory queue instead of
+committing an AuditLog row inside the request. A background task drains
+the queue and writes events with multi-row INSERTs (into the day
+partitions managed by ``audit.storage``), flushing when a batch
+fills up or the flush interval elapses. Events are hashed before they are
+queued, so raw VIDs and IPs never sit in memory.
+"""
+
+import asyncio
+import logging
+from datetime import datetime
+from typing import List, Optional
+
+from config import settings
+from database import engine
+from models.audit_log import AuditAction
+from audit.storage import audit_storage
+from security.crypto import hash_identifier
+
+
+logger = logging.getLogger(__name__)
+
+# Queue marker telling the flush loop to write what it has and exit
+_STOP = object()
+
+
+class AuditWriter:
+    """
+    Batches audit events and writes them in the background.
+
+    When the queue is full, new events are dropped and counted rather
+    than blocking the request that produced them.
+    """
+
+    def __init__(self, queue_size: int, batch_size: int, flush_interval: float):
+        self.queue_size = queue_size
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self._task: Optional[asyncio.Task] = None
+
+        # Counters
+        self.enqueued = 0
+        self.dropped = 0
+        self.written = 0
+        self.batches = 0
+        self.failed_batches = 0
+        self.lost = 0
+
+    def record(
+        self,
+        vid: str,
+        action: AuditAction,
+        result: str,
+        ip: Optional[str] = None
+    ) -> bool:
+        """
+        Queue an audit event.
+
+        Args:
+            vid: Virtual ID the event is about (hashed before queueing)
+            action: Audit action
+            result: Success message or failure reason
+            ip: Client IP address, if any (hashed before queueing)
+
+        Returns:
+            True if queued, False if dropped because the queue is full
+        """
+        event = {
+            "vid_hash": hash_identifier(vid),
+            "ip_hash": hash_identifier(ip) if ip else None,
+            "action": action,
+            "result": result,
+            "timestamp": datetime.utcnow()
+        }
+
+        try:
+            self._queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.dropped += 1
+            return False
+
+        self.enqueued += 1
+        return True
+
+    def start(self):
+        """Start the background flush task."""
+        if self._task is None:
+            if self._queue.empty():
+                # Fresh queue bound to the running loop (matters when the
+                # app is started more than once in a process)
+                self._queue = asyncio.Queue(maxsize=self.queue_size)
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the flush task after writing every queued event."""
+        if self._task is not None:
+            await self._queue.put(_STOP)
+            await self._task
+            self._task = None
+
+        # Events recorded while the loop was finishing
+        await self.flush_pending()
+
+    async def flush_pending(self):
+        """Write everything currently queued, in batches."""
+        batch = []
+        while not self._queue.empty():
+            event = self._queue.get_nowait()
+            if event is _STOP:
+                continue
+            batch.append(event)
+            if len(batch) >= self.batch_size:
+                await self._write(batch)
+                batch = []
+
+        if batch:
+            await self._write(batch)
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+
+        while True:
+            event = await self._queue.get()
+            if event is _STOP:
+                return
+
+            batch = [event]
+            stopping = False
+            deadline = loop.time() + self.flush_interval
+
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    event = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if event is _STOP:
+                    stopping = True
+                    break
+                batch.append(event)
+
+            await self._write(batch)
+            if stopping:
+                return
+
+    async def _write(self, batch: List[dict]):
+        try:
+            async with engine.begin() as conn:
+                await audit_storage.write(conn, batch)
+        except Exception:
+            self.failed_batches += 1
+            self.lost += len(batch)
+            logger.exception("Failed to write %d audit events", len(batch))
+            return
+
+        self.batches += 1
+        self.written += len(batch)
+
+    def stats(self) -> dict:
+        """Snapshot of queue depth and write counters."""
+        return {
+            "queue_depth": self._queue.qsize(),
+            "queue_size": self.queue_size,
+            "enqueued": self.enqueued,
+            "dropped": self.dropped,
+            "written": self.written,
+            "batches": self.batches,
+            "failed_batches": self.failed_batches,
+            "lost": self.lost
+        }
+
+
+# Global audit writer instance
+audit_writer = AuditWriter(
+    queue_size=settings.audit_queue_size,
+    batch_size=settings.audit_batch_size,
+    flush_interval=settings.audit_flush_interval_seconds
+)
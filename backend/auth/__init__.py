@@ -1,6 +1,10 @@
 """Authentication package."""
 
-from auth.jwt_handler import create_access_token, verify_token
-from auth.password import hash_password, verify_password
+from auth.jwt_handler import create_access_token, create_refresh_token, decode_token, verify_token
+from auth.password import hash_password, verify_password, password_hasher, PasswordHasherBusy
+from auth.principal_cache import principal_cache, Principal
+from auth.revocation import token_revocations
 
-__all__ = ["create_access_token", "verify_token", "hash_password", "verify_password"]
+__all__ = ["create_access_token", "create_refresh_token", "decode_token", "verify_token", "hash_password",
+           "verify_password", "password_hasher", "PasswordHasherBusy", "principal_cache", "Principal",
+           "token_revocations"]
@@ -1,5 +1,11 @@
 """
 JWT token handling for user authentication.
+
+Two token types:
+- access: short-lived, carries the user's profile, verification flags and
+  token version, so routes can authorize without loading the user
+- refresh: long-lived, carries only the user ID and token version; traded
+  at /auth/refresh for a new pair with current flags
 """
 
 from datetime import datetime, timedelta
@@ -7,23 +13,33 @@ from jose import JWTError, jwt
 from config import settings
 from typing import Optional
 
+ACCESS = "access"
+REFRESH = "refresh"
+
 
-def create_access_token(user_id: str) -> str:
+def create_access_token(user, token_version: int = 0) -> str:
     """
     Create a JWT access token for a user.
     
     Args:
-        user_id: User's UUID
-        
+        user: ``User`` row or ``Principal`` the token is issued to
+        token_version: User's current token version
+    
     Returns:
         Encoded JWT token
     """
-    expire = datetime.utcnow() + timedelta(hours=settings.jwt_expiry_hours)
+    expire = datetime.utcnow() + timedelta(minutes=settings.access_token_expiry_minutes)
     
     payload = {
-        "sub": user_id,  # Subject: user ID
+        "sub": user.id,  # Subject: user ID
+        "typ": ACCESS,
         "exp": expire,   # Expiration time
-        "iat": datetime.utcnow()  # Issued at
+        "iat": datetime.utcnow(),  # Issued at
+        "ver": token_version,
+        "email": user.email,
+        "name": user.name,
+        "aav": user.aadhaar_verified,
+        "pav": user.pan_verified
     }
     
     token = jwt.encode(
@@ -35,15 +51,45 @@ def create_access_token(user_id: str) -> str:
     return token
 
 
-def verify_token(token: str) -> Optional[str]:
+def create_refresh_token(user_id: str, token_version: int = 0) -> str:
     """
-    Verify and decode a JWT token.
+    Create a JWT refresh token for a user.
+    
+    Args:
+        user_id: User's UUID
+        token_version: User's current token version
+    
+    Returns:
+        Encoded JWT token
+    """
+    expire = datetime.utcnow() + timedelta(hours=settings.jwt_expiry_hours)
+    
+    payload = {
+        "sub": user_id,
+        "typ": REFRESH,
+        "exp": expire,
+        "iat": datetime.utcnow(),
+        "ver": token_version
+    }
+    
+    return jwt.encode(
+        payload,
+        settings.jwt_secret_key,
+        algorithm=settings.jwt_algorithm
+    )
+
+
+def decode_token(token: str, token_type: str = ACCESS) -> Optional[dict]:
+    """
+    Verify and decode a JWT token, returning its full payload.
     
     Args:
         token: JWT token string
-        
+        token_type: Expected ``typ`` claim (tokens issued before token
+            types existed count as access tokens)
+    
     Returns:
-        User ID if valid, None if invalid or expired
+        Decoded claims if valid, None if invalid, expired or of another type
     """
     try:
         payload = jwt.decode(
@@ -52,11 +98,30 @@ def verify_token(token: str) -> Optional[str]:
             algorithms=[settings.jwt_algorithm]
         )
         
-        user_id: str = payload.get("sub")
-        if user_id is None:
+        if payload.get("sub") is None:
             return None
-            
-        return user_id
         
+        if payload.get("typ", ACCESS) != token_type:
+            return None
+        
+        return payload
+    
     except JWTError:
         return None
+
+
+def verify_token(token: str) -> Optional[str]:
+    """
+    Verify and decode a JWT token.
+    
+    Args:
+        token: JWT token string
+    
+    Returns:
+        User ID if valid, None if invalid or expired
+    """
+    payload = decode_token(token)
+    if payload is None:
+        return None
+    
+    return payload["sub"]
@@ -1,27 +1,42 @@
 """
 Password hashing and verification using bcrypt directly.
+
+bcrypt is deliberately slow (~250 ms at 12 rounds), so the async routes
+never call it inline. They go through ``password_hasher``, which runs the
+work in a bounded worker pool and rejects new work when the pool is saturated.
 """
 
+import asyncio
+import multiprocessing
+import time
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Optional
+
 import bcrypt
 
+from config import settings
+from monitoring.metrics import password_hash_duration_seconds
+
 
-def hash_password(password: str) -> str:
+def hash_password(password: str, rounds: int = 12) -> str:
     """
     Hash a plaintext password using bcrypt.
-    
+
     Args:
         password: Plaintext password
-        
+        rounds: bcrypt cost factor
+
     Returns:
         Hashed password as string
     """
     # Convert password to bytes
     password_bytes = password.encode('utf-8')
-    
+
     # Generate salt and hash
-    salt = bcrypt.gensalt(rounds=12)
+    salt = bcrypt.gensalt(rounds=rounds)
     hashed = bcrypt.hashpw(password_bytes, salt)
-    
+
     # Return as string
     return hashed.decode('utf-8')
 
@@ -29,17 +44,153 @@ def hash_password(password: str) -> str:
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """
     Verify a plaintext password against a hashed password.
-    
+
     Args:
         plain_password: Plaintext password to verify
         hashed_password: Hashed password to compare against
-        
+
     Returns:
         True if password matches, False otherwise
     """
     # Convert to bytes
     password_bytes = plain_password.encode('utf-8')
     hashed_bytes = hashed_password.encode('utf-8')
-    
+
     # Verify
     return bcrypt.checkpw(password_bytes, hashed_bytes)
+
+
+class PasswordHasherBusy(Exception):
+    """Raised when the password hashing queue is full."""
+    pass
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt in a bounded worker pool off the event loop.
+
+    At most ``workers + queue_size`` operations may be pending at once.
+    Anything beyond that fails fast with ``PasswordHasherBusy`` instead of
+    piling up behind the pool.
+    """
+
+    def __init__(
+        self,
+        workers: int,
+        queue_size: int,
+        executor: str = "process",
+        rounds: int = 12,
+        latency_window: int = 1024
+    ):
+        self.workers = max(1, workers)
+        self.queue_size = max(0, queue_size)
+        self.executor_kind = executor
+        self.rounds = rounds
+
+        self._executor: Optional[Executor] = None
+        self._pending = 0
+        self._latencies = deque(maxlen=latency_window)
+
+        # Counters
+        self.completed = 0
+        self.rejected = 0
+        self.failed = 0
+
+    @property
+    def capacity(self) -> int:
+        """Maximum number of operations running or queued at once."""
+        return self.workers + self.queue_size
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.executor_kind == "thread":
+                # bcrypt releases the GIL, so threads also keep the loop free
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers,
+                    thread_name_prefix="bcrypt"
+                )
+            else:
+                # The pool starts lazily, once the database driver's threads
+                # are running; forking a threaded process can deadlock the
+                # child on an inherited lock, so never use plain fork
+                methods = multiprocessing.get_all_start_methods()
+                context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+                self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=context)
+        return self._executor
+
+    async def _submit(self, operation: str, func: Callable, *args):
+        if self._pending >= self.capacity:
+            self.rejected += 1
+            raise PasswordHasherBusy("Password hashing queue is full")
+
+        self._pending += 1
+        start = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(self._get_executor(), func, *args)
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self._pending -= 1
+
+        elapsed = time.perf_counter() - start
+        self._latencies.append(elapsed)
+        password_hash_duration_seconds.labels(operation).observe(elapsed)
+        self.completed += 1
+        return result
+
+    async def hash(self, password: str) -> str:
+        """Hash a password in the worker pool."""
+        return await self._submit("hash", hash_password, password, self.rounds)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        """Verify a password in the worker pool."""
+        return await self._submit("verify", verify_password, plain_password, hashed_password)
+
+    def stats(self) -> dict:
+        """
+        Snapshot of queue depth and latency.
+
+        Latency percentiles cover the most recent operations only and
+        include time spent waiting for a free worker.
+        """
+        latencies = sorted(self._latencies)
+
+        def percentile(p: float) -> Optional[float]:
+            if not latencies:
+                return None
+            index = min(len(latencies) - 1, int(p * len(latencies)))
+            return round(latencies[index] * 1000, 2)
+
+        return {
+            "workers": self.workers,
+            "executor": self.executor_kind,
+            "capacity": self.capacity,
+            "in_flight": min(self._pending, self.workers),
+            "queue_depth": max(0, self._pending - self.workers),
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "failed": self.failed,
+            "latency_ms": {
+                "p50": percentile(0.50),
+                "p95": percentile(0.95),
+                "p99": percentile(0.99),
+                "max": percentile(1.0),
+            }
+        }
+
+    def shutdown(self):
+        """Shut down the worker pool, waiting for running work to finish."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+
+# Global password hasher instance
+password_hasher = PasswordHasher(
+    workers=settings.password_hash_workers,
+    queue_size=settings.password_hash_queue_size,
+    executor=settings.password_hash_executor,
+    rounds=settings.bcrypt_rounds
+)
@@ -0,0 +1,211 @@
+"""
+In-process cache of authenticated principals.
+
+Maps a bearer token to a read-only snapshot of its user so the common
+authenticated request skips both JWT decoding and the ``users`` lookup.
+Entries expire after a TTL (never past the token's own ``exp``), the cache
+is LRU-bounded, and writers invalidate a user's entries after changing
+their row.
+
+Invalidation only reaches this process's cache. With several workers the
+cache therefore only holds fully verified users: verification flags only
+ever go from False to True, so such a snapshot cannot be made stale by a
+write in another worker.
+"""
+
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional, Set
+
+from config import settings
+
+
+@dataclass(frozen=True)
+class Principal:
+    """
+    Immutable snapshot of the authenticated user.
+
+    Carries only the columns routes read, so it is safe to share between
+    concurrent requests. Compatible with ``UserResponse.model_validate``.
+    """
+    id: str
+    email: str
+    name: str
+    aadhaar_verified: bool
+    pan_verified: bool
+
+    @classmethod
+    def from_user(cls, user) -> "Principal":
+        """Build a snapshot from a ``User`` ORM row."""
+        return cls(
+            id=user.id,
+            email=user.email,
+            name=user.name,
+            aadhaar_verified=user.aadhaar_verified,
+            pan_verified=user.pan_verified
+        )
+
+    @classmethod
+    def from_claims(cls, payload: dict) -> Optional["Principal"]:
+        """
+        Build a snapshot from access token claims.
+
+        Returns None for tokens without claims (issued before they
+        existed) and for users not yet fully verified: flags only ever go
+        from False to True, so only a fully verified snapshot cannot be
+        stale.
+        """
+        if not (payload.get("aav") and payload.get("pav")) or "email" not in payload:
+            return None
+        return cls(
+            id=payload["sub"],
+            email=payload["email"],
+            name=payload["name"],
+            aadhaar_verified=True,
+            pan_verified=True
+        )
+
+
+@dataclass
+class _Entry:
+    principal: Principal
+    expires_at: float
+
+
+class PrincipalCache:
+    """
+    TTL + LRU cache of principals keyed by (user id, token).
+
+    Lookups are by token; a secondary user id index lets writers drop every
+    token belonging to a user in one call.
+    """
+
+    def __init__(self, ttl_seconds: int, max_entries: int, verified_only: bool = False):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.verified_only = verified_only
+
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._tokens_by_user: Dict[str, Set[str]] = {}
+
+        # Bumped on every invalidation so a lookup that raced with a
+        # write can tell its snapshot may be stale
+        self.version = 0
+
+        # Counters
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0 and self.max_entries > 0
+
+    def get(self, token: str) -> Optional[Principal]:
+        """Return the cached principal for a token, or None on a miss."""
+        entry = self._entries.get(token)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        if entry.expires_at <= time.monotonic():
+            self._remove(token)
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(token)
+        self.hits += 1
+        return entry.principal
+
+    def put(
+        self,
+        token: str,
+        principal: Principal,
+        token_exp: Optional[float] = None,
+        version: Optional[int] = None
+    ):
+        """
+        Cache a principal for a token.
+
+        Args:
+            token: Bearer token the principal was resolved from
+            principal: User snapshot
+            token_exp: Token ``exp`` claim (epoch seconds), caps the TTL
+            version: ``self.version`` read before loading the user; the put
+                is skipped if an invalidation happened since
+        """
+        if not self.enabled:
+            return
+
+        if version is not None and version != self.version:
+            return
+
+        if self.verified_only and not (principal.aadhaar_verified and principal.pan_verified):
+            return
+
+        ttl = self.ttl_seconds
+        if token_exp is not None:
+            ttl = min(ttl, token_exp - time.time())
+            if ttl <= 0:
+                return
+
+        if token in self._entries:
+            self._remove(token)
+
+        self._entries[token] = _Entry(principal, time.monotonic() + ttl)
+        self._tokens_by_user.setdefault(principal.id, set()).add(token)
+
+        while len(self._entries) > self.max_entries:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def invalidate(self, user_id: str):
+        """Drop every cached token for a user. Call after writing their row."""
+        self.version += 1
+        tokens = self._tokens_by_user.pop(user_id, None)
+        if not tokens:
+            return
+
+        for token in tokens:
+            self._entries.pop(token, None)
+        self.invalidations += 1
+
+    def clear(self):
+        """Drop all entries."""
+        self._entries.clear()
+        self._tokens_by_user.clear()
+
+    def _remove(self, token: str):
+        entry = self._entries.pop(token, None)
+        if entry is None:
+            return
+
+        tokens = self._tokens_by_user.get(entry.principal.id)
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del self._tokens_by_user[entry.principal.id]
+
+    def stats(self) -> dict:
+        """Snapshot of cache size and hit/miss counters."""
+        return {
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "verified_only": self.verified_only,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations
+        }
+
+
+# Global principal cache instance
+principal_cache = PrincipalCache(
+    ttl_seconds=settings.principal_cache_ttl_seconds,
+    max_entries=settings.principal_cache_max_entries,
+    verified_only=settings.workers > 1
+)
@@ -0,0 +1,86 @@
+"""
+In-process table of revoked token versions.
+
+Access tokens are authorized from their own claims, without loading the
+user, so revoking a user's tokens (bumping their version in
+``user_token_versions``) would otherwise only take effect when the
+outstanding access tokens expire. This table remembers the new minimum
+version per user for one access token lifetime; after that every older
+access token has expired on its own, and refresh tokens are always
+checked against the database.
+
+Revocations only reach this process. Other workers keep accepting the
+old access tokens until they expire (at most
+``access_token_expiry_minutes``) but refuse to refresh them.
+"""
+
+import time
+from collections import OrderedDict
+from typing import Tuple
+
+from config import settings
+
+
+class TokenRevocations:
+    """
+    Minimum accepted token version per user, with expiring entries.
+
+    Bounded LRU: past ``max_entries`` the oldest revocation is forgotten
+    early (counted in ``evictions``).
+    """
+
+    def __init__(self, ttl_seconds: int, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[int, float]]" = OrderedDict()
+
+        # Counters
+        self.revocations = 0
+        self.rejected = 0
+        self.evictions = 0
+
+    def revoke(self, user_id: str, version: int):
+        """Reject tokens of ``user_id`` issued under a version below ``version``."""
+        entry = self._entries.pop(user_id, None)
+        if entry is not None:
+            # Concurrent revocations can finish out of order
+            version = max(version, entry[0])
+        self._entries[user_id] = (version, time.monotonic() + self.ttl_seconds)
+        self.revocations += 1
+
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def is_revoked(self, user_id: str, version: int) -> bool:
+        """Whether a token issued to ``user_id`` under ``version`` was revoked."""
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return False
+
+        min_version, expires_at = entry
+        if expires_at <= time.monotonic():
+            del self._entries[user_id]
+            return False
+
+        if version < min_version:
+            self.rejected += 1
+            return True
+        return False
+
+    def stats(self) -> dict:
+        """Snapshot of table size and counters."""
+        return {
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "revocations": self.revocations,
+            "rejected": self.rejected,
+            "evictions": self.evictions
+        }
+
+
+# Global token revocation table
+token_revocations = TokenRevocations(
+    ttl_seconds=settings.access_token_expiry_minutes * 60,
+    max_entries=settings.token_revocation_max_entries
+)
@@ -0,0 +1,380 @@
+"""
+End-to-end load benchmark for the register -> verify -> generate ->
+verify-vid flow.
+
+Drives the real ``main:app`` either in-process through httpx's ASGI
+transport (default: fresh temporary SQLite file, or --database-url) or
+against a running server (--base-url). Scenarios:
+
+- login_storm: concurrent logins (bcrypt pool; --login-requests of them)
+- generation: POST /vid/generate across verified users
+- gate_surge: POST /verify-vid with pre-issued VIDs and QR tokens, plus
+  unknown VIDs as scanner noise
+- mixed: login, generate, verify, list and stats traffic together
+
+Reports throughput and p50/p95/p99 per route, optionally runs the crypto
+microbenchmarks, saves results as a JSON baseline and exits non-zero when
+a result regresses past --threshold against a saved baseline.
+
+Usage (from backend/):
+    python -m benchmarks.load
+    python -m benchmarks.load --scenarios gate_surge,mixed --requests 2000 --concurrency 32
+    python -m benchmarks.load --save-baseline bench-baseline.json
+    python -m benchmarks.load --baseline bench-baseline.json --threshold 0.2
+    python -m benchmarks.load --base-url http://127.0.0.1:8000
+
+In-process runs disable rate limiting unless --keep-rate-limits is given;
+a remote server is measured with whatever limits it is configured with
+(429s are counted as errors).
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import secrets
+import string
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from typing import Callable, Dict, List, Optional
+
+try:
+    import httpx
+except ImportError:
+    sys.exit("The load benchmark needs httpx: pip install httpx")
+
+
+SCENARIOS = ("login_storm", "generation", "gate_surge", "mixed")
+PASSWORD = "bench-password-1"
+
+
+def percentile(sorted_values: List[float], p: float) -> Optional[float]:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(p * len(sorted_values)))
+    return sorted_values[index]
+
+
+class Recorder:
+    """Latencies and error counts per route for one scenario."""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+
+    async def request(self, client: "httpx.AsyncClient", route: str, method: str, url: str, **kwargs):
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+        except httpx.HTTPError:
+            self.latencies[route].append(time.perf_counter() - started)
+            self.errors[route] += 1
+            return None
+
+        self.latencies[route].append(time.perf_counter() - started)
+        if response.status_code >= 400:
+            self.errors[route] += 1
+        return response
+
+    def summary(self, elapsed: float) -> dict:
+        routes = {}
+        for route, values in sorted(self.latencies.items()):
+            values = sorted(values)
+            routes[route] = {
+                "count": len(values),
+                "errors": self.errors[route],
+                "rps": round(len(values) / elapsed, 1),
+                "p50_ms": round(percentile(values, 0.50) * 1000, 2),
+                "p95_ms": round(percentile(values, 0.95) * 1000, 2),
+                "p99_ms": round(percentile(values, 0.99) * 1000, 2)
+            }
+        total = sum(route["count"] for route in routes.values())
+        return {
+            "requests": total,
+            "seconds": round(elapsed, 3),
+            "throughput": round(total / elapsed, 1),
+            "routes": routes
+        }
+
+
+class Harness:
+    """Shared client, users and pre-issued VIDs for the scenarios."""
+
+    def __init__(self, client: "httpx.AsyncClient", users: int, concurrency: int, seed: int):
+        self.client = client
+        self.user_count = users
+        self.concurrency = concurrency
+        self.random = random.Random(seed)
+        self.run_id = secrets.token_hex(4)
+        self.users: List[dict] = []
+        self.vids: List[dict] = []
+
+    async def gather_limited(self, count: int, op: Callable[[int], object]):
+        """Run op(0..count-1) with at most ``concurrency`` in flight."""
+        next_index = 0
+
+        async def worker():
+            nonlocal next_index
+            while next_index < count:
+                index = next_index
+                next_index += 1
+                await op(index)
+
+        await asyncio.gather(*(worker() for _ in range(min(self.concurrency, count))))
+
+    async def setup_users(self):
+        """Register users and complete (simulated) identity verification."""
+        setup = Recorder()
+
+        async def create(index: int):
+            email = f"bench-{self.run_id}-{index}@example.com"
+            response = await setup.request(self.client, "register", "POST", "/auth/register", json={
+                "email": email, "password": PASSWORD, "name": f"Bench User {index}"
+            })
+            if response is None or response.status_code != 201:
+                raise RuntimeError(f"Registration failed: {response and response.text}")
+
+            tokens = response.json()
+            headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+            aadhaar = "".join(self.random.choices(string.digits, k=12))
+            pan = "".join(self.random.choices(string.ascii_uppercase, k=5)) + "1234F"
+            await setup.request(self.client, "aadhaar", "POST", "/verify/aadhaar", headers=headers,
+                                json={"aadhaar_number": aadhaar, "otp": "123456"})
+            await setup.request(self.client, "pan", "POST", "/verify/pan", headers=headers,
+                                json={"pan_number": pan})
+
+            # Renew so the access token carries the verified flags
+            response = await setup.request(self.client, "refresh", "POST", "/auth/refresh",
+                                           json={"refresh_token": tokens["refresh_token"]})
+            if response is None or response.status_code != 200:
+                raise RuntimeError(f"Token refresh failed: {response and response.text}")
+            headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+            self.users.append({"email": email, "headers": headers})
+
+        await self.gather_limited(self.user_count, create)
+
+    async def issue_vids(self, count: int):
+        """Pre-issue VIDs through /vid/generate-batch (not timed)."""
+        setup = Recorder()
+        batches = [min(100, count - start) for start in range(0, count, 100)]
+
+        async def issue(index: int):
+            user = self.users[index % len(self.users)]
+            response = await setup.request(
+                self.client, "generate-batch", "POST",
+                f"/vid/generate-batch?count={batches[index]}", headers=user["headers"]
+            )
+            if response is None or response.status_code != 201:
+                raise RuntimeError(f"VID issuance failed: {response and response.text}")
+            self.vids.extend(response.json()["vids"])
+
+        await self.gather_limited(len(batches), issue)
+        self.random.shuffle(self.vids)
+
+    def unknown_vid(self) -> str:
+        return str(self.random.randrange(100000000000, 999999999999))
+
+    async def verify_one(self, recorder: Recorder):
+        """One gate scan: 80% issued VIDs (half as QR tokens), 20% unknown."""
+        if self.vids and self.random.random() < 0.8:
+            issued = self.vids.pop()
+            body = {"qr_payload": issued["qr_token"]} if self.random.random() < 0.5 else {"vid": issued["vid"]}
+        else:
+            body = {"vid": self.unknown_vid()}
+        await recorder.request(self.client, "POST /verify-vid", "POST", "/verify-vid", json=body)
+
+    async def run(self, name: str, requests: int) -> dict:
+        recorder = Recorder()
+        users = self.users
+
+        async def login_storm(index: int):
+            user = users[index % len(users)]
+            await recorder.request(self.client, "POST /auth/login", "POST", "/auth/login",
+                                   json={"email": user["email"], "password": PASSWORD})
+
+        async def generation(index: int):
+            await recorder.request(self.client, "POST /vid/generate", "POST", "/vid/generate",
+                                   headers=users[index % len(users)]["headers"])
+
+        async def gate_surge(index: int):
+            await self.verify_one(recorder)
+
+        async def mixed(index: int):
+            roll = self.random.random()
+            if roll < 0.05:
+                await login_storm(index)
+            elif roll < 0.20:
+                await generation(index)
+            elif roll < 0.75:
+                await self.verify_one(recorder)
+            elif roll < 0.90:
+                await recorder.request(self.client, "GET /vid/list", "GET", "/vid/list?limit=20",
+                                       headers=users[index % len(users)]["headers"])
+            else:
+                await recorder.request(self.client, "GET /vid/stats", "GET", "/vid/stats",
+                                       headers=users[index % len(users)]["headers"])
+
+        ops = {
+            "login_storm": login_storm,
+            "generation": generation,
+            "gate_surge": gate_surge,
+            "mixed": mixed,
+        }
+        if name in ("gate_surge", "mixed"):
+            await self.issue_vids(int(requests * 0.8) + 1)
+
+        started = time.perf_counter()
+        await self.gather_limited(requests, ops[name])
+        return recorder.summary(time.perf_counter() - started)
+
+
+@asynccontextmanager
+async def open_client(args):
+    """Client for a remote server, or for main:app in-process."""
+    if args.base_url:
+        async with httpx.AsyncClient(base_url=args.base_url, timeout=60) as client:
+            yield client
+        return
+
+    # Settings are read at import time, so configure before importing the app
+    os.environ["DATABASE_URL"] = args.database_url or (
+        f"sqlite+aiosqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+    )
+    os.environ.setdefault("AUDIT_ARCHIVE_DIR", tempfile.mkdtemp())
+    if not args.keep_rate_limits:
+        os.environ["RATE_LIMIT_ENABLED"] = "false"
+
+    from main import app
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+            yield client
+
+
+def print_scenario(name: str, result: dict):
+    print(f"\n{name}: {result['requests']} requests in {result['seconds']}s "
+          f"({result['throughput']} req/s)")
+    print(f"  {'route':<22}{'count':>7}{'errors':>8}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    for route, stats in result["routes"].items():
+        print(f"  {route:<22}{stats['count']:>7}{stats['errors']:>8}{stats['rps']:>9}"
+              f"{stats['p50_ms']:>9}{stats['p95_ms']:>9}{stats['p99_ms']:>9}")
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> List[str]:
+    """
+    Regressions of ``results`` against ``baseline``.
+
+    A scenario regresses when throughput drops, or a route's p95 rises,
+    by more than ``threshold`` (a fraction); a microbenchmark when its
+    ops/s drops by more than ``threshold``.
+    """
+    regressions = []
+
+    for name, result in results.get("scenarios", {}).items():
+        base = baseline.get("scenarios", {}).get(name)
+        if base is None:
+            continue
+        if result["throughput"] < base["throughput"] * (1 - threshold):
+            regressions.append(f"{name}: throughput {result['throughput']} < baseline {base['throughput']}")
+        for route, stats in result["routes"].items():
+            base_route = base["routes"].get(route)
+            if base_route and stats["p95_ms"] > base_route["p95_ms"] * (1 + threshold):
+                regressions.append(f"{name} {route}: p95 {stats['p95_ms']} ms > baseline {base_route['p95_ms']} ms")
+
+    for name, result in results.get("micro", {}).items():
+        base = baseline.get("micro", {}).get(name)
+        if base and result["ops_per_sec"] < base["ops_per_sec"] * (1 - threshold):
+            regressions.append(f"micro {name}: {result['ops_per_sec']} ops/s < baseline {base['ops_per_sec']}")
+
+    return regressions
+
+
+async def run(args) -> dict:
+    names = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = set(names) - set(SCENARIOS)
+    if unknown:
+        sys.exit(f"Unknown scenarios: {', '.join(sorted(unknown))} (choose from {', '.join(SCENARIOS)})")
+
+    results = {
+        "meta": {
+            "target": args.base_url or "in-process",
+            "requests": args.requests,
+            "login_requests": args.login_requests,
+            "concurrency": args.concurrency,
+            "users": args.users,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+        },
+        "scenarios": {}
+    }
+
+    async with open_client(args) as client:
+        harness = Harness(client, args.users, args.concurrency, args.seed)
+        print(f"Setting up {args.users} verified users...")
+        await harness.setup_users()
+
+        for name in names:
+            requests = args.login_requests if name == "login_storm" else args.requests
+            result = await harness.run(name, requests)
+            results["scenarios"][name] = result
+            print_scenario(name, result)
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end load benchmark")
+    parser.add_argument("--base-url", help="Benchmark a running server instead of the in-process app")
+    parser.add_argument("--database-url", help="In-process database (default: fresh temporary SQLite file)")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="Comma-separated scenarios")
+    parser.add_argument("--requests", type=int, default=400, help="Requests per scenario")
+    parser.add_argument("--login-requests", type=int, default=64,
+                        help="Requests for login_storm (each one is a full bcrypt verify)")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--users", type=int, default=16, help="Verified users to spread load over")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--keep-rate-limits", action="store_true", help="Leave rate limiting on in-process")
+    parser.add_argument("--no-micro", action="store_true", help="Skip the crypto microbenchmarks")
+    parser.add_argument("--output", help="Write results JSON here")
+    parser.add_argument("--save-baseline", help="Write results JSON here as the new baseline")
+    parser.add_argument("--baseline", help="Compare against this baseline JSON")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="Allowed regression as a fraction (0.25 = 25%%)")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+
+    if not args.no_micro:
+        from benchmarks.micro import run_micro, print_micro
+        print()
+        results["micro"] = run_micro()
+        print_micro(results["micro"])
+
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, "w") as f:
+                json.dump(results, f, indent=2)
+            print(f"\nResults written to {path}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\nREGRESSIONS (threshold {args.threshold:.0%}):")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print(f"\nNo regressions against {args.baseline} (threshold {args.threshold:.0%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Microbenchmarks for the per-request crypto helpers.
+
+Times ``generate_vid``, ``hash_identifier``, ``generate_qr_payload`` and
+``verify_qr_payload`` (both the JSON payload and the compact token) with
+timeit, taking the best of several repeats.
+
+Usage (from backend/):
+    python -m benchmarks.micro
+    python -m benchmarks.micro --number 50000 --repeat 7
+"""
+
+import argparse
+import timeit
+from datetime import datetime, timedelta
+from typing import Dict
+
+
+def run_micro(number: int = 20000, repeat: int = 5) -> Dict[str, dict]:
+    """
+    Run every microbenchmark.
+
+    Returns:
+        {name: {"ops_per_sec": ..., "ns_per_op": ...}}
+    """
+    from security.crypto import (
+        generate_vid,
+        hash_identifier,
+        generate_qr_payload,
+        generate_qr_token,
+        verify_qr_payload,
+    )
+
+    vid = generate_vid()
+    expires_at = datetime.utcnow().replace(microsecond=0) + timedelta(hours=1)
+    payload = generate_qr_payload(vid, expires_at)
+    token = generate_qr_token(vid, expires_at)
+
+    cases = {
+        "generate_vid": generate_vid,
+        "hash_identifier": lambda: hash_identifier(vid),
+        "generate_qr_payload": lambda: generate_qr_payload(vid, expires_at),
+        "verify_qr_payload": lambda: verify_qr_payload(payload),
+        "verify_qr_payload_token": lambda: verify_qr_payload(token),
+    }
+
+    results = {}
+    for name, func in cases.items():
+        best = min(timeit.repeat(func, number=number, repeat=repeat)) / number
+        results[name] = {
+            "ops_per_sec": round(1 / best),
+            "ns_per_op": round(best * 1e9)
+        }
+    return results
+
+
+def print_micro(results: Dict[str, dict]):
+    print(f"{'benchmark':<26}{'ops/s':>14}{'ns/op':>10}")
+    for name, result in results.items():
+        print(f"{name:<26}{result['ops_per_sec']:>14,}{result['ns_per_op']:>10,}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Crypto helper microbenchmarks")
+    parser.add_argument("--number", type=int, default=20000, help="Calls per timing run")
+    parser.add_argument("--repeat", type=int, default=5, help="Timing runs (best is kept)")
+    args = parser.parse_args()
+
+    print_micro(run_micro(args.number, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
@@ -4,10 +4,47 @@ Uses Pydantic Settings for environment variable management.
 """
 
 from pydantic_settings import BaseSettings
-from pydantic import Field
+from pydantic import Field, PrivateAttr, model_validator
+from typing import Optional
+import json
+import os
 import secrets
 
 
+SECRET_KEY_FIELDS = ("jwt_secret_key", "hmac_secret_key")
+
+
+def load_or_create_keyfile(path: str) -> dict:
+    """
+    Read the shared secret keys from a JSON keyfile, creating it first if
+    it does not exist.
+
+    The file is written to a temporary name and hard-linked into place,
+    so processes starting at the same time all end up with the one file
+    that won the race, never a partial one.
+    """
+    if not os.path.exists(path):
+        keys = {name: secrets.token_urlsafe(32) for name in SECRET_KEY_FIELDS}
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w") as f:
+            json.dump(keys, f)
+        try:
+            os.link(temp_path, path)
+        except FileExistsError:
+            pass
+        finally:
+            os.unlink(temp_path)
+
+    with open(path) as f:
+        keys = json.load(f)
+
+    missing = [name for name in SECRET_KEY_FIELDS if not keys.get(name)]
+    if missing:
+        raise ValueError(f"Keyfile {path} is missing {', '.join(missing)}")
+    return keys
+
+
 class Settings(BaseSettings):
     """Application settings loaded from environment variables."""
     
@@ -17,34 +54,175 @@ class Settings(BaseSettings):
         description="Database connection URL"
     )
     
+    # Optional read-only database for list/lookup paths: a replica URL, or the
+    # same SQLite file opened read-only, e.g.
+    # sqlite+aiosqlite:///file:./vid_system.db?mode=ro&uri=true
+    database_read_url: Optional[str] = None
+    
+    # Engine profile: "auto" (from the URL), "sqlite", "postgres" or "default"
+    db_profile: str = "auto"
+    
+    # SQLite profile
+    sqlite_busy_timeout_ms: int = 5000  # Wait for locks instead of "database is locked"
+    sqlite_mmap_size: int = 268435456  # 256 MiB memory-mapped I/O
+    sqlite_cache_size: int = -65536  # Negative = KiB, so 64 MiB page cache
+    
+    # Postgres profile
+    db_pool_size: int = 10
+    db_max_overflow: int = 20
+    db_pool_recycle_seconds: int = 1800
+    db_pool_timeout_seconds: int = 30
+    db_pool_pre_ping: bool = True
+    db_prepared_statement_cache_size: int = 500  # asyncpg statements cached per connection
+    
+    # Serving (python main.py)
+    host: str = "0.0.0.0"
+    port: int = 8000
+    workers: int = Field(default=1, ge=1)  # Uvicorn worker processes
+    reload: bool = False  # Development auto-reload (single worker only)
+    # Proxies whose X-Forwarded-For is trusted for the client IP (rate limit
+    # keys, audit IP hashes). Comma-separated IPs/CIDRs, or "*" when the app
+    # is only reachable through a proxy (e.g. Render)
+    forwarded_allow_ips: str = "127.0.0.1"
+    maintenance_lock_path: str = "./maintenance.lock"  # Elects the worker running background maintenance
+    
+    # Secret keys: set JWT_SECRET_KEY / HMAC_SECRET_KEY, or point SECRETS_FILE
+    # at a JSON keyfile shared by every worker (created on first start).
+    # Unset keys without a keyfile are random per process, so tokens and QR
+    # codes do not survive a restart and multiple workers refuse to start.
+    secrets_file: Optional[str] = None
+    
     # JWT Settings
-    jwt_secret_key: str = Field(
-        default_factory=lambda: secrets.token_urlsafe(32),
+    jwt_secret_key: Optional[str] = Field(
+        default=None,
         description="Secret key for JWT token signing"
     )
     jwt_algorithm: str = "HS256"
-    jwt_expiry_hours: int = 24
+    jwt_expiry_hours: int = 24  # Refresh token (session) lifetime
+    access_token_expiry_minutes: int = 15  # Claims-carrying access tokens
+    token_revocation_max_entries: int = 100000  # Users with recently revoked tokens
+    
+    # Authenticated-principal cache (skips the users lookup per request)
+    principal_cache_ttl_seconds: int = 60  # 0 disables the cache
+    principal_cache_max_entries: int = 10000  # LRU bound on cached tokens
     
     # HMAC Signing Key for QR Codes
-    hmac_secret_key: str = Field(
-        default_factory=lambda: secrets.token_urlsafe(32),
+    hmac_secret_key: Optional[str] = Field(
+        default=None,
         description="Secret key for HMAC signing of QR codes"
     )
+    qr_key_id: int = Field(default=1, ge=0, le=255, description="Key ID stamped into compact QR tokens for hmac_secret_key")
+    qr_retired_keys: dict[int, str] = Field(
+        default_factory=dict,
+        description="Previous QR keys by key ID, still accepted for outstanding tokens"
+    )
     
     # VID Settings
     vid_expiry_minutes: int = 60  # VIDs expire after 1 hour
     vid_usage_limit: int = 1  # One-time use by default
+    generate_batch_max_count: int = 100  # Max VIDs per /vid/generate-batch call
+    vid_list_max_limit: int = 200  # Max page size for /vid/list
+    vid_stats_cache_ttl_seconds: int = 30  # 0 disables the /vid/stats cache
+    vid_stats_cache_max_entries: int = 10000
+    
+    # VID reaper (deletes VIDs once they are past expiry plus a grace period)
+    vid_reaper_enabled: bool = True
+    vid_reaper_interval_seconds: float = 300  # Time between runs
+    vid_reaper_grace_minutes: int = 1440  # Keep expired rows a day for precise verify errors
+    vid_reaper_batch_size: int = 500  # Rows deleted per transaction
+    vid_reaper_batch_pause_seconds: float = 0.05  # Yield between batches
+    
+    # VID existence filter (answers unknown VIDs without a DB lookup)
+    vid_filter_enabled: bool = True
+    vid_filter_capacity: int = 1_000_000  # Expected number of VID rows
+    vid_filter_error_rate: float = 0.01  # Target false-positive rate at capacity
+    vid_filter_sync_overlap_seconds: float = 60  # Multi-worker catch-up re-read window (> longest VID insert)
+    vid_filter_sync_interval_seconds: float = 1  # Min time between multi-worker catch-ups; misses in between hit the DB
+    vid_filter_rebuild_interval_seconds: float = 3600  # Multi-worker reload, dropping VIDs other workers reaped (0 disables)
+    
+    # Bulk verification
+    verify_batch_max_items: int = 100  # Max VIDs per /verify-vid/batch call
+    
+    # Audit log writer (write-behind batching)
+    audit_queue_size: int = 10000  # Events buffered before new ones are dropped
+    audit_batch_size: int = 500  # Max rows per multi-row INSERT
+    audit_flush_interval_seconds: float = 0.5  # Max time an event waits in the queue
+    
+    # Audit storage (one partition per day; retention drops whole partitions)
+    audit_retention_days: int = 90  # 0 keeps every partition
+    audit_partition_premake_days: int = 2  # PostgreSQL partitions created ahead of time
+    audit_rollup_retention_days: int = 365  # Per-minute rollups kept for dashboards
+    audit_maintenance_interval_seconds: float = 3600
+    audit_export_batch_size: int = 5000  # Rows fetched per server-side cursor round trip
+    audit_search_max_limit: int = 1000  # Max records per /audit/search call
+    
+    # Cold-tier audit archive (partitions past retention become segment files)
+    audit_archive_enabled: bool = True
+    audit_archive_dir: str = "./audit_archive"
+    audit_archive_block_rows: int = 1024  # Rows per compressed block
+    
+    # Prometheus-style /metrics endpoint and request/DB instrumentation
+    metrics_enabled: bool = True
+    # /metrics is served to these client IPs/CIDRs, or to requests with
+    # Authorization: Bearer <metrics_token> when a token is set
+    metrics_allow_ips: list[str] = ["127.0.0.1", "::1"]
+    metrics_token: Optional[str] = None
+    
+    # Opt-in request profiling (cProfile + optional tracemalloc)
+    profiling_enabled: bool = False  # Installs the profiling middleware
+    profiling_secret: Optional[str] = None  # Enables signed X-Profile-Token requests
+    profiling_sample_rate: float = Field(default=0.0, ge=0.0, le=1.0)  # Fraction of requests profiled
+    profiling_trace_memory: bool = False  # Also record top allocations (slower)
+    profiling_dir: str = "./profiles"
+    profiling_max_captures: int = 50  # Oldest captures are deleted beyond this
+    profiling_top_entries: int = 40  # Rows per section of the text report
+    
+    # Accounts allowed to use admin endpoints (audit, profiles)
+    admin_emails: list[str] = []
     
     # Rate Limiting
-    rate_limit_verification: str = "10/minute"  # VID verification endpoint
-    rate_limit_generation: str = "5/minute"  # VID generation endpoint
+    rate_limit_enabled: bool = True
+    rate_limit_verification: str = "10/minute"  # VIDs verified per IP (batch items count individually)
+    rate_limit_generation: str = "5/minute"  # VIDs generated per user and IP (batches count each VID)
+    rate_limit_auth: str = "20/minute"  # Login/registration (bcrypt) per IP
+    rate_limit_backend: str = "memory"  # "memory" (per process) or "sqlite" (shared file)
+    rate_limit_sqlite_path: str = "./rate_limits.db"
+    rate_limit_max_keys: int = 100000  # Memory backend bound (LRU per shard)
+    rate_limit_shards: int = 16
     
     # Security
     bcrypt_rounds: int = 12
     
+    # Password hashing pool (keeps bcrypt off the event loop)
+    password_hash_workers: int = 2  # Worker processes/threads running bcrypt
+    password_hash_queue_size: int = 32  # Extra requests allowed to wait for a worker
+    password_hash_executor: str = "process"  # "process" or "thread"
+    
     # CORS
     cors_origins: list[str] = ["http://localhost:3000", "http://localhost:8000", "http://127.0.0.1:8000"]
     
+    _ephemeral_keys: list = PrivateAttr(default_factory=list)
+    
+    @model_validator(mode="after")
+    def _load_key_material(self):
+        """Fill unset secret keys from the keyfile, or with random ones."""
+        missing = [name for name in SECRET_KEY_FIELDS if not getattr(self, name)]
+        if missing and self.secrets_file:
+            keys = load_or_create_keyfile(self.secrets_file)
+            for name in missing:
+                setattr(self, name, keys[name])
+            missing = []
+        
+        for name in missing:
+            setattr(self, name, secrets.token_urlsafe(32))
+        self._ephemeral_keys = missing
+        return self
+    
+    @property
+    def ephemeral_keys(self) -> list:
+        """Secret keys generated for this process only (not shared)."""
+        return list(self._ephemeral_keys)
+    
     class Config:
         env_file = ".env"
         env_file_encoding = "utf-8"
@@ -3,17 +3,128 @@ Database configuration and session management.
 Uses SQLAlchemy with async support.
 """
 
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import DeclarativeBase
 from config import settings
+from monitoring.instrumentation import instrument_engine
+
+
+def resolve_profile(database_url: str, profile: str = "auto") -> str:
+    """
+    Pick the engine profile for a URL.
+    
+    "auto" chooses "sqlite" or "postgres" from the URL's backend; "default"
+    keeps SQLAlchemy's stock settings.
+    """
+    if profile != "auto":
+        return profile
+    
+    backend = make_url(database_url).get_backend_name()
+    if backend == "sqlite":
+        return "sqlite"
+    if backend == "postgresql":
+        return "postgres"
+    return "default"
+
+
+def _sqlite_pragmas(read_only: bool = False) -> list:
+    if read_only:
+        # A read-only connection cannot change the journal mode; it just
+        # follows whatever the writer set
+        return [
+            "PRAGMA query_only=ON",
+            f"PRAGMA busy_timeout={settings.sqlite_busy_timeout_ms}",
+            f"PRAGMA mmap_size={settings.sqlite_mmap_size}",
+            f"PRAGMA cache_size={settings.sqlite_cache_size}",
+        ]
+    return [
+        "PRAGMA journal_mode=WAL",
+        "PRAGMA synchronous=NORMAL",
+        f"PRAGMA busy_timeout={settings.sqlite_busy_timeout_ms}",
+        f"PRAGMA mmap_size={settings.sqlite_mmap_size}",
+        f"PRAGMA cache_size={settings.sqlite_cache_size}",
+        "PRAGMA temp_store=MEMORY",
+    ]
+
+
+def create_engine_for_profile(
+    database_url: str,
+    profile: str = "auto",
+    read_only: bool = False,
+    **kwargs
+) -> AsyncEngine:
+    """
+    Create an async engine tuned by a named profile.
+    
+    Profiles:
+    - sqlite: WAL journal, synchronous=NORMAL, busy_timeout, mmap and page
+      cache pragmas on every new connection. WAL lets readers run during
+      writes and turns most commits into a log append instead of a
+      rollback-journal rewrite.
+    - postgres: configurable pool size/overflow/recycle, pre-ping and the
+      asyncpg prepared-statement cache.
+    - default: SQLAlchemy defaults (the original behaviour).
+    
+    Args:
+        database_url: SQLAlchemy async database URL
+        profile: "auto", "sqlite", "postgres" or "default"
+        read_only: Engine only serves reads (SQLite connections get query_only)
+        **kwargs: Extra create_async_engine arguments (override the profile)
+    """
+    profile = resolve_profile(database_url, profile)
+    options = {
+        "echo": False,  # Set to True for SQL query logging during development
+        "future": True
+    }
+    
+    if profile == "postgres":
+        options.update(
+            pool_size=settings.db_pool_size,
+            max_overflow=settings.db_max_overflow,
+            pool_recycle=settings.db_pool_recycle_seconds,
+            pool_pre_ping=settings.db_pool_pre_ping,
+            pool_timeout=settings.db_pool_timeout_seconds,
+            connect_args={
+                "prepared_statement_cache_size": settings.db_prepared_statement_cache_size
+            }
+        )
+    
+    options.update(kwargs)
+    new_engine = create_async_engine(database_url, **options)
+    
+    if profile == "sqlite":
+        pragmas = _sqlite_pragmas(read_only)
+        in_memory = make_url(database_url).database in (None, "", ":memory:")
+        
+        @event.listens_for(new_engine.sync_engine, "connect")
+        def _apply_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            for pragma in pragmas:
+                # WAL does not apply to in-memory databases
+                if in_memory and "journal_mode" in pragma:
+                    continue
+                cursor.execute(pragma)
+            cursor.close()
+    
+    return new_engine
 
 
 # Create async engine
-engine = create_async_engine(
-    settings.database_url,
-    echo=False,  # Set to True for SQL query logging during development
-    future=True
-)
+engine = create_engine_for_profile(settings.database_url, settings.db_profile)
+
+# Read engine for read-only paths: a replica, or a read-only SQLite URI of
+# the same file. Falls back to the primary engine when not configured.
+if settings.database_read_url:
+    read_engine = create_engine_for_profile(settings.database_read_url, settings.db_profile, read_only=True)
+else:
+    read_engine = engine
+
+if settings.metrics_enabled:
+    instrument_engine(engine, "primary")
+    if read_engine is not engine:
+        instrument_engine(read_engine, "read")
 
 # Create async session factory
 AsyncSessionLocal = async_sessionmaker(
@@ -24,6 +135,15 @@ AsyncSessionLocal = async_sessionmaker(
     autoflush=False
 )
 
+# Session factory for the read engine
+AsyncReadSessionLocal = async_sessionmaker(
+    read_engine,
+    class_=AsyncSession,
+    expire_on_commit=False,
+    autocommit=False,
+    autoflush=False
+)
+
 
 class Base(DeclarativeBase):
     """Base class for all database models."""
@@ -42,7 +162,29 @@ async def get_db() -> AsyncSession:
             await session.close()
 
 
+async def get_read_db() -> AsyncSession:
+    """
+    Dependency function to get a read-only database session.
+    
+    Use for paths that never write (listings, lookups) so they do not
+    compete with the write path for the primary pool or SQLite lock.
+    """
+    async with AsyncReadSessionLocal() as session:
+        try:
+            yield session
+        finally:
+            await session.close()
+
+
 async def init_db():
     """Initialize database tables."""
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        # create_all skips existing tables, so add indexes declared since
+        await conn.run_sync(_create_missing_indexes)
+
+
+def _create_missing_indexes(sync_conn):
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(sync_conn, checkfirst=True)
@@ -9,13 +9,34 @@ It does NOT integrate with official government APIs.
 It is NOT affiliated with or endorsed by any government entity.
 """
 
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI, HTTPException, Request, status
+from fastapi.responses import Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
 from contextlib import asynccontextmanager
+import hmac
+import ipaddress
 
 from database import init_db
-from routes import auth_router, verification_router, virtual_id_router, verify_vid_router
+from auth.password import password_hasher
+from audit.storage import audit_storage
+from audit.writer import audit_writer
+from audit.archive import audit_archive
+from security.vid_filter import vid_filter
+from security.rate_limit import rate_limiter
+from maintenance.reaper import vid_reaper
+from routes import (
+    auth_router,
+    verification_router,
+    virtual_id_router,
+    verify_vid_router,
+    audit_router,
+    admin_router
+)
+from monitoring.instrumentation import MetricsMiddleware
+from monitoring.metrics import registry, CONTENT_TYPE
+from monitoring.profiling import ProfilingMiddleware
+from serving import check_key_material, maintenance_lock
 from config import settings
 
 
@@ -24,11 +45,28 @@ async def lifespan(app: FastAPI):
     """
     Lifespan context manager for startup and shutdown events.
     """
+    # Refuse to serve as one of several workers with per-process keys
+    check_key_material()
+    
     # Startup: Initialize database
     await init_db()
     print("✅ Database initialized")
+    await vid_filter.load()
+    await audit_storage.prepare()
+    audit_storage.start()
+    audit_writer.start()
+    vid_reaper.start()
+    vid_filter.start()
     yield
     # Shutdown: cleanup if needed
+    await vid_filter.stop()
+    await vid_reaper.stop()
+    await audit_writer.stop()
+    await audit_storage.stop()
+    audit_archive.close()
+    password_hasher.shutdown()
+    rate_limiter.close()
+    maintenance_lock.release()
     print("👋 Shutting down")
 
 
@@ -82,11 +120,22 @@ async def add_security_headers(request, call_next):
     return response
 
 
+# Opt-in request profiling (not installed at all unless enabled)
+if settings.profiling_enabled:
+    app.add_middleware(ProfilingMiddleware)
+
+# Request metrics (outermost, so latency covers every other middleware)
+if settings.metrics_enabled:
+    app.add_middleware(MetricsMiddleware)
+
+
 # Register routers
 app.include_router(auth_router)
 app.include_router(verification_router)
 app.include_router(virtual_id_router)
 app.include_router(verify_vid_router)
+app.include_router(audit_router)
+app.include_router(admin_router)
 
 
 @app.get("/")
@@ -103,15 +152,42 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    """Health check endpoint."""
+    """Health check endpoint (per-component stats are at /admin/stats)."""
     return {"status": "healthy"}
 
 
+def require_metrics_access(request: Request):
+    """
+    Dependency restricting /metrics to ``metrics_allow_ips`` or to
+    requests carrying ``Authorization: Bearer <metrics_token>``.
+    """
+    if not settings.metrics_enabled:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    
+    if settings.metrics_token:
+        scheme, _, credentials = request.headers.get("Authorization", "").partition(" ")
+        if scheme.lower() == "bearer" and hmac.compare_digest(credentials.encode(), settings.metrics_token.encode()):
+            return
+    
+    try:
+        client_ip = ipaddress.ip_address(request.client.host)
+    except (AttributeError, ValueError):
+        client_ip = None
+    if client_ip is not None and any(
+        client_ip in ipaddress.ip_network(network, strict=False) for network in settings.metrics_allow_ips
+    ):
+        return
+    
+    raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Metrics access denied")
+
+
+@app.get("/metrics", include_in_schema=False, dependencies=[Depends(require_metrics_access)])
+async def metrics():
+    """Prometheus text exposition of request, DB, pool and crypto metrics."""
+    return Response(registry.render(), media_type=CONTENT_TYPE)
+
+
 if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run(
-        "main:app",
-        host="0.0.0.0",
-        port=8000,
-        reload=True
-    )
+    # WORKERS, HOST, PORT and RELOAD come from settings (see serving.py)
+    from serving import serve
+    serve()
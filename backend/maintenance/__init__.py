@@ -0,0 +1,5 @@
+"""Background maintenance tasks."""
+
+from maintenance.reaper import vid_reaper, VIDReaper
+
+__all__ = ["vid_reaper", "VIDReaper"]
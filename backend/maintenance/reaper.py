@@ -0,0 +1,181 @@
+"""
+Background reaper for terminal Virtual IDs.
+
+Nothing else deletes rows from ``virtual_ids``, so expired, revoked and
+used VIDs would pile up forever and bloat the table and the ``vid``
+primary key index every verification probes. The reaper periodically
+deletes VIDs whose expiry is older than a grace period, in small batches
+served by the ``expires_at`` index, and pauses between batches so it
+never holds the write lock for long.
+
+Every VID ends up expired, so expiry is the one timestamp that covers all
+terminal states; a used or revoked VID keeps its row until then, and
+verifiers keep getting the precise failure reason during the grace period.
+Each deleted VID gets an ``EXPIRED`` audit row written in the same
+transaction as the delete.
+"""
+
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from sqlalchemy import select, delete
+
+from audit.storage import audit_storage
+from config import settings
+from database import engine
+from models.audit_log import AuditAction
+from models.virtual_id import VirtualID
+from security.crypto import hash_identifier
+from security.vid_filter import vid_filter
+from security.vid_stats_cache import vid_stats_cache
+from serving import maintenance_lock
+
+
+logger = logging.getLogger(__name__)
+
+
+class VIDReaper:
+    """
+    Deletes VIDs past ``expires_at + grace`` on a fixed interval.
+    """
+
+    def __init__(
+        self,
+        interval: float,
+        grace: timedelta,
+        batch_size: int,
+        batch_pause: float,
+        enabled: bool = True
+    ):
+        self.enabled = enabled
+        self.interval = interval
+        self.grace = grace
+        self.batch_size = max(1, batch_size)
+        self.batch_pause = batch_pause
+
+        self._task: Optional[asyncio.Task] = None
+
+        # Counters
+        self.runs = 0
+        self.reclaimed = 0
+        self.failed_runs = 0
+        self.last_run_reclaimed = 0
+        self.last_run_seconds = 0.0
+        self.last_run_at: Optional[datetime] = None
+
+    def start(self):
+        """Start the periodic reaper task."""
+        if self.enabled and self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        """Cancel the reaper task (a batch in flight is rolled back)."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _loop(self):
+        while True:
+            # With several workers only the maintenance lock holder reaps
+            if maintenance_lock.held():
+                try:
+                    await self.run_once()
+                except Exception:
+                    self.failed_runs += 1
+                    logger.exception("VID reaper run failed")
+            await asyncio.sleep(self.interval)
+
+    async def run_once(self, now: Optional[datetime] = None) -> int:
+        """
+        Delete every VID that expired before ``now - grace``.
+
+        Returns:
+            Number of rows reclaimed
+        """
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        cutoff = (now or datetime.utcnow()) - self.grace
+
+        reclaimed = 0
+        while True:
+            deleted = await self._reap_batch(cutoff)
+            reclaimed += len(deleted)
+            if len(deleted) < self.batch_size:
+                break
+            # Let verifications and inserts take the write lock in between
+            await asyncio.sleep(self.batch_pause)
+
+        self.runs += 1
+        self.reclaimed += reclaimed
+        self.last_run_reclaimed = reclaimed
+        self.last_run_seconds = round(loop.time() - started, 3)
+        self.last_run_at = datetime.utcnow()
+        if reclaimed:
+            logger.info("VID reaper reclaimed %d rows in %.3fs", reclaimed, self.last_run_seconds)
+
+        return reclaimed
+
+    async def _reap_batch(self, cutoff: datetime) -> List[str]:
+        oldest = (
+            select(VirtualID.vid)
+            .where(VirtualID.expires_at < cutoff)
+            .order_by(VirtualID.expires_at)
+            .limit(self.batch_size)
+        )
+
+        async with engine.begin() as conn:
+            result = await conn.execute(
+                delete(VirtualID)
+                .where(VirtualID.vid.in_(oldest.scalar_subquery()))
+                .returning(VirtualID.vid, VirtualID.user_id)
+            )
+            rows = result.all()
+            if not rows:
+                return []
+
+            timestamp = datetime.utcnow()
+            await audit_storage.write(conn, [
+                {
+                    "vid_hash": hash_identifier(vid),
+                    "ip_hash": None,
+                    "action": AuditAction.EXPIRED,
+                    "result": "VID reclaimed after expiry",
+                    "timestamp": timestamp
+                }
+                for vid, _ in rows
+            ])
+
+        for vid, user_id in rows:
+            vid_filter.remove(vid)
+        for user_id in {user_id for _, user_id in rows}:
+            vid_stats_cache.invalidate(user_id)
+
+        return [vid for vid, _ in rows]
+
+    def stats(self) -> dict:
+        """Snapshot of run and reclaim counters."""
+        return {
+            "enabled": self.enabled,
+            "runs": self.runs,
+            "reclaimed": self.reclaimed,
+            "failed_runs": self.failed_runs,
+            "last_run_reclaimed": self.last_run_reclaimed,
+            "last_run_seconds": self.last_run_seconds,
+            "last_run_at": self.last_run_at.isoformat() if self.last_run_at else None
+        }
+
+
+# Global VID reaper instance
+vid_reaper = VIDReaper(
+    interval=settings.vid_reaper_interval_seconds,
+    grace=timedelta(minutes=settings.vid_reaper_grace_minutes),
+    batch_size=settings.vid_reaper_batch_size,
+    batch_pause=settings.vid_reaper_batch_pause_seconds,
+    enabled=settings.vid_reaper_enabled
+)
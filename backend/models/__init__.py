@@ -1,7 +1,8 @@
 """Database models package."""
 
 from models.user import User
-from models.virtual_id import VirtualID
-from models.audit_log import AuditLog
+from models.virtual_id import VirtualID, VIDStatus
+from models.audit_log import AuditLog, AuditRollup
+from models.token_version import UserTokenVersion
 
-__all__ = ["User", "VirtualID", "AuditLog"]
+__all__ = ["User", "VirtualID", "VIDStatus", "AuditLog", "AuditRollup", "UserTokenVersion"]
@@ -1,9 +1,13 @@
 """
-Audit log model - tracks all VID operations for security and compliance.
-Stores hashed identifiers only, no PII.
+Audit log models - track all VID operations for security and compliance.
+Store hashed identifiers only, no PII.
+
+Rows are stored in per-day partitions (see ``audit.storage``); AuditLog
+describes the schema every partition shares.
 """
 
-from sqlalchemy import Column, Integer, String, DateTime, Enum
+from sqlalchemy import Column, Integer, String, DateTime, Enum, Identity, Index, PrimaryKeyConstraint
+from sqlalchemy.ext.compiler import compiles
 from datetime import datetime
 import enum
 from database import Base
@@ -23,13 +27,24 @@ class AuditLog(Base):
     Audit log for VID operations.
     
     Privacy-preserving: Stores hashed VID and IP, no direct identifiers.
+    
+    On PostgreSQL this is the parent of natively range-partitioned daily
+    tables, so its primary key also includes the timestamp there (see
+    ``_primary_key``). On SQLite rows go to rotated ``audit_logs_pYYYYMMDD``
+    tables and this table only holds rows written before partitioning
+    existed. ``id`` is unique across all partitions on both.
     """
     __tablename__ = "audit_logs"
+    __table_args__ = (
+        # Serves per-VID audit search in time order without a sort
+        Index("ix_audit_logs_vid_hash_timestamp", "vid_hash", "timestamp"),
+        {"postgresql_partition_by": "RANGE (timestamp)", "info": {"partition_key": "timestamp"}},
+    )
     
-    id = Column(Integer, primary_key=True, autoincrement=True)
+    id = Column(Integer, Identity(), primary_key=True)
     
     # Hashed identifiers (privacy-preserving)
-    vid_hash = Column(String(64), nullable=False, index=True)  # SHA-256 of VID
+    vid_hash = Column(String(64), nullable=False)  # SHA-256 of VID
     ip_hash = Column(String(64), nullable=True)  # SHA-256 of IP address
     
     # Action details
@@ -41,3 +56,36 @@ class AuditLog(Base):
     
     def __repr__(self):
         return f"<AuditLog(id={self.id}, action={self.action}, timestamp={self.timestamp})>"
+
+
+@compiles(PrimaryKeyConstraint, "postgresql")
+def _primary_key(constraint, compiler, **kw):
+    """
+    Add the partition key to a partitioned table's primary key.
+    
+    PostgreSQL requires it, but only there: on SQLite a composite key
+    would stop ``id`` from being the auto-incrementing rowid.
+    """
+    ddl = compiler.visit_primary_key_constraint(constraint, **kw)
+    partition_key = constraint.table.info.get("partition_key")
+    if not ddl or partition_key is None:
+        return ddl
+    # "... PRIMARY KEY (id)": the first ")" closes the column list
+    return ddl.replace(")", f", {compiler.preparer.quote(partition_key)})", 1)
+
+
+class AuditRollup(Base):
+    """
+    Per-minute count of audit events by action, for dashboards.
+    
+    Maintained by the audit storage layer as batches are written, so
+    charts never scan the raw audit partitions.
+    """
+    __tablename__ = "audit_rollups"
+    
+    minute = Column(DateTime, primary_key=True)  # Event timestamp truncated to the minute
+    action = Column(Enum(AuditAction), primary_key=True)
+    count = Column(Integer, default=0, nullable=False)
+    
+    def __repr__(self):
+        return f"<AuditRollup(minute={self.minute}, action={self.action}, count={self.count})>"
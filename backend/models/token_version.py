@@ -0,0 +1,26 @@
+"""
+Token version model - per-user counter for revoking issued tokens.
+"""
+
+from sqlalchemy import Column, String, Integer, DateTime, ForeignKey
+from datetime import datetime
+from database import Base
+
+
+class UserTokenVersion(Base):
+    """
+    Current token version of a user.
+    
+    Every access and refresh token carries the version it was issued
+    under; bumping the version revokes all of them. Users without a row
+    are at version 0. Kept out of ``users`` so existing databases pick it
+    up through ``create_all``.
+    """
+    __tablename__ = "user_token_versions"
+    
+    user_id = Column(String(36), ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    version = Column(Integer, default=0, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    
+    def __repr__(self):
+        return f"<UserTokenVersion(user_id={self.user_id}, version={self.version})>"
@@ -2,12 +2,25 @@
 Virtual ID model - stores temporary, one-time-use virtual identifiers.
 """
 
-from sqlalchemy import Column, String, Boolean, DateTime, Integer, ForeignKey
+from sqlalchemy import Column, String, Boolean, DateTime, Integer, ForeignKey, Index, and_
 from sqlalchemy.orm import relationship
 from datetime import datetime
+import enum
 from database import Base
 
 
+class VIDStatus(str, enum.Enum):
+    """
+    Mutually exclusive VID states.
+    
+    Precedence matches verification: revoked, then expired, then used.
+    """
+    ACTIVE = "active"
+    EXPIRED = "expired"
+    USED = "used"
+    REVOKED = "revoked"
+
+
 class VirtualID(Base):
     """
     Virtual ID model for temporary identity tokens.
@@ -19,13 +32,19 @@ class VirtualID(Base):
     - Auditable (linked to user)
     """
     __tablename__ = "virtual_ids"
+    __table_args__ = (
+        # Serves per-user listings newest-first (keyset pagination on created_at, vid)
+        Index("ix_virtual_ids_user_created", "user_id", "created_at", "vid"),
+        # Multi-worker VID filter catch-up reads by issue time
+        Index("ix_virtual_ids_created", "created_at"),
+    )
     
     vid = Column(String(12), primary_key=True)  # 12-digit unique identifier
     user_id = Column(String(36), ForeignKey("users.id"), nullable=False, index=True)
     
     # Timestamps
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
-    expires_at = Column(DateTime, nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)  # Reaper scans by expiry
     
     # Usage tracking
     usage_limit = Column(Integer, default=1, nullable=False)  # Default: one-time use
@@ -48,6 +67,20 @@ class VirtualID(Base):
             return False
         return True
     
+    @classmethod
+    def status_condition(cls, status: VIDStatus, now: datetime):
+        """
+        SQL condition selecting VIDs in a given state at time ``now``.
+        """
+        not_revoked = cls.revoked.is_(False)
+        if status == VIDStatus.REVOKED:
+            return cls.revoked.is_(True)
+        if status == VIDStatus.EXPIRED:
+            return and_(not_revoked, cls.expires_at <= now)
+        if status == VIDStatus.USED:
+            return and_(not_revoked, cls.expires_at > now, cls.usage_count >= cls.usage_limit)
+        return and_(not_revoked, cls.expires_at > now, cls.usage_count < cls.usage_limit)
+    
     @property
     def is_used(self) -> bool:
         """Check if VID has been used up."""
@@ -0,0 +1,6 @@
+"""Metrics and instrumentation package."""
+
+from monitoring.metrics import registry, Registry, Counter, Gauge, Histogram
+from monitoring.instrumentation import instrument_engine, MetricsMiddleware
+
+__all__ = ["registry", "Registry", "Counter", "Gauge", "Histogram", "instrument_engine", "MetricsMiddleware"]
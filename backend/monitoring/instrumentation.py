@@ -0,0 +1,127 @@
+"""
+Hooks feeding the metrics registry from the ASGI app and the DB engines.
+"""
+
+import time
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from monitoring.metrics import (
+    http_requests_total,
+    http_request_duration_seconds,
+    http_requests_in_progress,
+    db_query_duration_seconds,
+    db_pool_checkout_seconds,
+    db_pool_connections_in_use,
+    db_pool_size,
+)
+
+
+_STATEMENT_KINDS = ("SELECT", "INSERT", "UPDATE", "DELETE")
+
+
+def _statement_kind(statement: str) -> str:
+    head = statement.lstrip()[:6].upper()
+    return head if head in _STATEMENT_KINDS else "OTHER"
+
+
+def instrument_engine(engine: AsyncEngine, name: str):
+    """
+    Time SQL statements and pool checkouts, and track connections in use.
+
+    Args:
+        engine: Async engine to instrument
+        name: ``engine`` label value ("primary", "read")
+    """
+    sync_engine = engine.sync_engine
+    pool = sync_engine.pool
+    queries = {kind: db_query_duration_seconds.labels(name, kind) for kind in _STATEMENT_KINDS + ("OTHER",)}
+    checkout = db_pool_checkout_seconds.labels(name)
+    in_use = db_pool_connections_in_use.labels(name)
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._metrics_started = time.perf_counter()
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, "_metrics_started", None)
+        if started is not None:
+            queries[_statement_kind(statement)].observe(time.perf_counter() - started)
+
+    @event.listens_for(pool, "checkout")
+    def _checkout(dbapi_connection, connection_record, connection_proxy):
+        in_use.inc()
+
+    @event.listens_for(pool, "checkin")
+    def _checkin(dbapi_connection, connection_record):
+        in_use.dec()
+
+    # The pool has no "checkout started" event, so time connect() itself:
+    # queueing for a free connection plus opening a new one
+    connect = pool.connect
+
+    def timed_connect():
+        started = time.perf_counter()
+        try:
+            return connect()
+        finally:
+            checkout.observe(time.perf_counter() - started)
+
+    pool.connect = timed_connect
+
+    size = getattr(pool, "size", None)
+    if callable(size):
+        db_pool_size.set_function(size, name)
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording per-route latency and status counts.
+
+    Labels use the matched route template (``/vid/revoke/{vid}``), never
+    the raw path, so label cardinality stays bounded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._children = {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        http_requests_in_progress.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            http_requests_in_progress.dec()
+            route = scope.get("route")
+            path = route.path if route is not None else "unmatched"
+            self._record(scope["method"], path, status_code, time.perf_counter() - started)
+
+    def _record(self, method: str, path: str, status_code: int, elapsed: float):
+        key = (method, path, status_code)
+        children = self._children.get(key)
+        if children is None:
+            children = (
+                http_request_duration_seconds.labels(method, path),
+                http_requests_total.labels(method, path, status_code)
+            )
+            self._children[key] = children
+
+        duration, total = children
+        duration.observe(elapsed)
+        total.inc()
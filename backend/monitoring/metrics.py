@@ -0,0 +1,269 @@
+"""
+In-process metrics registry with Prometheus text exposition.
+
+Counters, gauges and histograms keyed by label values. Updates are plain
+attribute writes with no locking: everything that records a metric runs
+on the event loop thread (SQLAlchemy's async engines fire their sync
+events there too), so an observation costs about a microsecond.
+"""
+
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+
+# Seconds; covers sub-millisecond SQL up to slow bcrypt and streaming exports
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+# HMAC runs in microseconds
+FAST_BUCKETS = (
+    0.000001, 0.0000025, 0.000005, 0.00001, 0.000025,
+    0.00005, 0.0001, 0.00025, 0.0005, 0.001
+)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    """Base for a metric family: one child per combination of label values."""
+
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        if not self.labelnames:
+            self._default = self.labels()
+
+    def labels(self, *values: str):
+        """Child for these label values (cache it on hot paths)."""
+        key = tuple(str(value) for value in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}")
+            child = self._new_child()
+            self._children[key] = child
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type_name}",
+            *self.samples()
+        ]
+
+
+class _Value:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1):
+        self.value += amount
+
+    def dec(self, amount: float = 1):
+        self.value -= amount
+
+    def set(self, value: float):
+        self.value = value
+
+
+class Counter(_Metric):
+    """Monotonically increasing count."""
+
+    type_name = "counter"
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount: float = 1):
+        self._default.inc(amount)
+
+    def samples(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(child.value)}"
+            for key, child in self._children.items()
+        ]
+
+
+class Gauge(Counter):
+    """
+    Value that can go up and down, or be read from a callback at scrape time.
+    """
+
+    type_name = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._functions: Dict[Tuple[str, ...], Callable[[], float]] = {}
+
+    def set(self, value: float):
+        self._default.set(value)
+
+    def dec(self, amount: float = 1):
+        self._default.dec(amount)
+
+    def set_function(self, function: Callable[[], float], *values: str):
+        """Report ``function()`` for these label values at every scrape."""
+        self._functions[tuple(str(value) for value in values)] = function
+
+    def samples(self) -> List[str]:
+        for key, function in self._functions.items():
+            try:
+                self.labels(*key).set(function())
+            except Exception:
+                continue
+        return super().samples()
+
+
+class _HistogramValue:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Histogram(_Metric):
+    """Distribution of observations in cumulative buckets."""
+
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value: float):
+        self._default.observe(value)
+
+    def samples(self) -> List[str]:
+        lines = []
+        for key, child in self._children.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), child.counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(child.sum)}")
+            lines.append(f"{self.name}_count{labels} {child.count}")
+        return lines
+
+
+class Registry:
+    """Collection of metric families rendered together."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Duplicate metric: {metric.name}")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Optional[Sequence[float]] = None
+    ) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets or DEFAULT_BUCKETS))
+
+    def render(self) -> str:
+        """All metrics in Prometheus text exposition format (0.0.4)."""
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Global metrics registry
+registry = Registry()
+
+# HTTP
+http_requests_total = registry.counter(
+    "http_requests_total", "HTTP requests by route and status code", ("method", "route", "status")
+)
+http_request_duration_seconds = registry.histogram(
+    "http_request_duration_seconds", "HTTP request latency by route", ("method", "route")
+)
+http_requests_in_progress = registry.gauge(
+    "http_requests_in_progress", "HTTP requests currently being served"
+)
+
+# Database
+db_query_duration_seconds = registry.histogram(
+    "db_query_duration_seconds", "SQL statement execution time (cursor execute)", ("engine", "statement")
+)
+db_pool_checkout_seconds = registry.histogram(
+    "db_pool_checkout_seconds", "Time waiting to check a connection out of the pool", ("engine",)
+)
+db_pool_connections_in_use = registry.gauge(
+    "db_pool_connections_in_use", "Connections currently checked out of the pool", ("engine",)
+)
+db_pool_size = registry.gauge(
+    "db_pool_size", "Configured pool size (persistent connections)", ("engine",)
+)
+
+# Crypto
+password_hash_duration_seconds = registry.histogram(
+    "password_hash_duration_seconds", "bcrypt hash/verify time including pool queueing", ("operation",)
+)
+hmac_duration_seconds = registry.histogram(
+    "hmac_duration_seconds", "QR HMAC-SHA256 computation time", ("format",), buckets=FAST_BUCKETS
+)
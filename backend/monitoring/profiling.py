@@ -0,0 +1,257 @@
+"""
+Opt-in per-request profiling.
+
+With ``profiling_enabled`` set, a request is captured when it carries a
+valid signed ``X-Profile-Token`` header or is picked by
+``profiling_sample_rate``. The request runs under cProfile (and
+optionally tracemalloc); the call statistics (``.prof``, loadable with
+pstats/snakeviz), a text report with the hottest call paths and top
+allocations, and a JSON summary are written to a rotating directory.
+
+cProfile and tracemalloc see the whole event-loop thread, so only one
+request is captured at a time and concurrent requests are never profiled
+(they may still show up in a capture's call tree). When profiling is
+disabled the middleware is not installed at all.
+
+Mint a header token with::
+
+    python -m monitoring.profiling /vid/generate
+"""
+
+import asyncio
+import cProfile
+import hashlib
+import hmac
+import io
+import json
+import logging
+import pstats
+import random
+import re
+import secrets
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional
+
+from config import settings
+
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = b"x-profile-token"
+_CAPTURE_ID = re.compile(r"^[0-9]+-[0-9a-f]{8}$")
+
+
+def sign_profile_token(path: str, secret: str, ttl_seconds: int = 300) -> str:
+    """
+    Build an ``X-Profile-Token`` value for one path.
+
+    Format: ``<expires epoch>.<hex HMAC-SHA256 of "expires:path">``
+    """
+    expires = int(time.time()) + ttl_seconds
+    signature = hmac.new(secret.encode(), f"{expires}:{path}".encode(), hashlib.sha256).hexdigest()
+    return f"{expires}.{signature}"
+
+
+class Profiler:
+    """
+    Decides which requests to profile and manages the capture directory.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        max_captures: int,
+        sample_rate: float,
+        secret: Optional[str],
+        trace_memory: bool,
+        top_entries: int
+    ):
+        self.directory = Path(directory)
+        self.max_captures = max(1, max_captures)
+        self.sample_rate = sample_rate
+        self.secret = secret
+        self.trace_memory = trace_memory
+        self.top_entries = top_entries
+
+        self.busy = False
+
+        # Counters
+        self.captures = 0
+        self.skipped_busy = 0
+        self.rejected_tokens = 0
+
+    def verify_token(self, token: str, path: str) -> bool:
+        """Check a header token's signature, path binding and expiry."""
+        if not self.secret:
+            return False
+        try:
+            expires, signature = token.split(".", 1)
+            if int(expires) < time.time():
+                return False
+        except ValueError:
+            return False
+
+        expected = hmac.new(self.secret.encode(), f"{expires}:{path}".encode(), hashlib.sha256).hexdigest()
+        return hmac.compare_digest(expected, signature)
+
+    def wants(self, scope) -> bool:
+        """Whether to profile this request (signed header, else sampling)."""
+        for name, value in scope["headers"]:
+            if name == PROFILE_HEADER:
+                if self.verify_token(value.decode("latin-1"), scope["path"]):
+                    return True
+                self.rejected_tokens += 1
+                break
+
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def _write(self, capture: dict, profile: cProfile.Profile, snapshot: Optional[tracemalloc.Snapshot]):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        stem = self.directory / capture["id"]
+
+        profile.dump_stats(f"{stem}.prof")
+
+        report = io.StringIO()
+        report.write(
+            f"{capture['method']} {capture['path']} -> {capture['status']} "
+            f"in {capture['duration_ms']} ms at {capture['created_at']}\n\n"
+        )
+        stats = pstats.Stats(profile, stream=report)
+        stats.sort_stats("cumulative").print_stats(self.top_entries)
+        stats.sort_stats("tottime").print_stats(self.top_entries)
+
+        if snapshot is not None:
+            report.write("Top allocations (by line)\n")
+            for stat in snapshot.statistics("lineno")[:self.top_entries]:
+                report.write(f"  {stat}\n")
+
+        Path(f"{stem}.txt").write_text(report.getvalue())
+        Path(f"{stem}.json").write_text(json.dumps(capture))
+
+        self._rotate()
+
+    def _rotate(self):
+        summaries = sorted(self.directory.glob("*.json"))
+        for old in summaries[:-self.max_captures]:
+            for suffix in (".json", ".prof", ".txt"):
+                old.with_suffix(suffix).unlink(missing_ok=True)
+
+    async def save(self, capture: dict, profile: cProfile.Profile, snapshot: Optional[tracemalloc.Snapshot]):
+        """Write a capture's files off the event loop."""
+        try:
+            await asyncio.to_thread(self._write, capture, profile, snapshot)
+            self.captures += 1
+        except Exception:
+            logger.exception("Failed to write profile %s", capture["id"])
+
+    def list_captures(self, limit: int = 50) -> List[dict]:
+        """Most recent capture summaries, newest first."""
+        if not self.directory.is_dir():
+            return []
+
+        captures = []
+        for path in sorted(self.directory.glob("*.json"), reverse=True)[:limit]:
+            try:
+                captures.append(json.loads(path.read_text()))
+            except (OSError, ValueError):
+                continue
+        return captures
+
+    def report_path(self, capture_id: str, suffix: str) -> Optional[Path]:
+        """Path of a capture's ``.txt`` or ``.prof`` file, if it exists."""
+        if not _CAPTURE_ID.match(capture_id) or suffix not in (".txt", ".prof"):
+            return None
+        path = self.directory / f"{capture_id}{suffix}"
+        return path if path.exists() else None
+
+    def stats(self) -> dict:
+        """Snapshot of capture counters."""
+        return {
+            "sample_rate": self.sample_rate,
+            "header_enabled": bool(self.secret),
+            "trace_memory": self.trace_memory,
+            "captures": self.captures,
+            "skipped_busy": self.skipped_busy,
+            "rejected_tokens": self.rejected_tokens
+        }
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware running selected requests under the profiler.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not profiler.wants(scope):
+            await self.app(scope, receive, send)
+            return
+
+        if profiler.busy:
+            profiler.skipped_busy += 1
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        profiler.busy = True
+        trace_memory = profiler.trace_memory and not tracemalloc.is_tracing()
+        profile = cProfile.Profile()
+        snapshot = None
+        started = time.perf_counter()
+        try:
+            if trace_memory:
+                tracemalloc.start()
+            profile.enable()
+            try:
+                await self.app(scope, receive, send_with_status)
+            finally:
+                profile.disable()
+                if trace_memory:
+                    snapshot = tracemalloc.take_snapshot()
+                    tracemalloc.stop()
+        finally:
+            profiler.busy = False
+
+        route = scope.get("route")
+        capture = {
+            "id": f"{int(time.time() * 1000)}-{secrets.token_hex(4)}",
+            "method": scope["method"],
+            "path": scope["path"],
+            "route": route.path if route is not None else None,
+            "status": status_code,
+            "duration_ms": round((time.perf_counter() - started) * 1000, 2),
+            "created_at": datetime.utcnow().isoformat(),
+            "trace_memory": snapshot is not None
+        }
+        await profiler.save(capture, profile, snapshot)
+
+
+# Global profiler instance
+profiler = Profiler(
+    directory=settings.profiling_dir,
+    max_captures=settings.profiling_max_captures,
+    sample_rate=settings.profiling_sample_rate,
+    secret=settings.profiling_secret,
+    trace_memory=settings.profiling_trace_memory,
+    top_entries=settings.profiling_top_entries
+)
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) != 2 or not settings.profiling_secret:
+        sys.exit("usage: PROFILING_SECRET=... python -m monitoring.profiling <path>")
+    print(sign_profile_token(sys.argv[1], settings.profiling_secret))
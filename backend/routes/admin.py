@@ -0,0 +1,111 @@
+"""
+Admin routes: per-component stats, request profile captures and forced
+token revocation.
+"""
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import FileResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+import os
+
+from config import settings
+from database import get_db
+from models.user import User
+from schemas.admin import ProfileCapture, ProfileListResponse
+from auth.password import password_hasher
+from auth.principal_cache import principal_cache
+from auth.revocation import token_revocations
+from audit.storage import audit_storage
+from audit.writer import audit_writer
+from audit.export import audit_exporter
+from audit.archive import audit_archive
+from security.vid_filter import vid_filter
+from security.crypto import qr_verifier
+from security.rate_limit import rate_limiter
+from security.vid_stats_cache import vid_stats_cache
+from maintenance.reaper import vid_reaper
+from monitoring.profiling import profiler
+from routes.auth import require_admin, revoke_tokens
+from serving import maintenance_lock
+
+
+router = APIRouter(prefix="/admin", tags=["Admin"], dependencies=[Depends(require_admin)])
+
+
+@router.get("/stats")
+async def get_stats():
+    """
+    Counters from every in-process component, for the worker that answered.
+    """
+    return {
+        "worker": {"pid": os.getpid(), "workers": settings.workers, "maintenance": maintenance_lock.stats()},
+        "password_hasher": password_hasher.stats(),
+        "principal_cache": principal_cache.stats(),
+        "token_revocations": token_revocations.stats(),
+        "audit_writer": audit_writer.stats(),
+        "audit_storage": audit_storage.stats(),
+        "audit_exporter": audit_exporter.stats(),
+        "audit_archive": audit_archive.stats(),
+        "vid_filter": vid_filter.stats(),
+        "qr_verifier": qr_verifier.stats(),
+        "rate_limiter": rate_limiter.stats(),
+        "vid_stats_cache": vid_stats_cache.stats(),
+        "vid_reaper": vid_reaper.stats(),
+        "profiler": profiler.stats() if settings.profiling_enabled else None
+    }
+
+
+@router.get("/profiles", response_model=ProfileListResponse)
+async def list_profiles(
+    limit: int = Query(50, ge=1, le=500, description="Max captures")
+):
+    """
+    List recent profile captures, newest first.
+    """
+    captures = [ProfileCapture(**capture) for capture in profiler.list_captures(limit)]
+    return ProfileListResponse(captures=captures, total=len(captures))
+
+
+@router.get("/profiles/{capture_id}")
+async def get_profile(
+    capture_id: str,
+    format: str = Query("txt", pattern="^(txt|prof)$", description="txt report or raw pstats dump")
+):
+    """
+    Download a capture's text report (call tree and top allocations) or
+    its raw ``.prof`` file for pstats/snakeviz.
+    """
+    path = profiler.report_path(capture_id, f".{format}")
+    if path is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Profile not found"
+        )
+    
+    if format == "txt":
+        return FileResponse(path, media_type="text/plain")
+    return FileResponse(path, media_type="application/octet-stream", filename=path.name)
+
+
+@router.post("/users/{user_id}/revoke-tokens")
+async def revoke_user_tokens(
+    user_id: str,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Force a user to sign in again by revoking all their tokens.
+    
+    Refresh tokens stop working at once on every worker. Outstanding
+    access tokens are rejected at once by this worker and expire within
+    ``access_token_expiry_minutes`` on the others.
+    """
+    user = await db.scalar(select(User.id).where(User.id == user_id))
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
+        )
+    
+    version = await revoke_tokens(db, user_id)
+    return {"success": True, "user_id": user_id, "token_version": version}
@@ -0,0 +1,129 @@
+"""
+Admin audit routes: streaming exports, record search across the hot and
+archived tiers, and per-minute rollups.
+"""
+
+from datetime import datetime, timedelta, timezone
+from typing import List, Literal, Optional, Tuple
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+
+from models.audit_log import AuditAction
+from config import settings
+from schemas.audit import AuditRollupResponse, AuditRollupItem, AuditLogItem, AuditSearchResponse
+from security.crypto import hash_identifier
+from audit.archive import audit_archive
+from audit.export import audit_exporter, MEDIA_TYPES
+from audit.storage import audit_storage
+from routes.auth import require_admin
+
+
+router = APIRouter(prefix="/audit", tags=["Audit"], dependencies=[Depends(require_admin)])
+
+
+def utc_naive(value: Optional[datetime]) -> Optional[datetime]:
+    """Timestamps are stored as naive UTC; convert aware bounds to match."""
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def check_range(
+    since: Optional[datetime],
+    until: Optional[datetime]
+) -> Tuple[Optional[datetime], Optional[datetime]]:
+    """
+    Normalize a time range to naive UTC and reject an empty or inverted one.
+    
+    Must run before the bounds reach storage: comparing an aware bound
+    with the naive stored timestamps raises, and inside a streaming
+    export that would only surface as a truncated 200 response.
+    """
+    since, until = utc_naive(since), utc_naive(until)
+    if since is not None and until is not None and since >= until:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="since must be before until"
+        )
+    return since, until
+
+
+@router.get("/export")
+async def export_audit_logs(
+    format: Literal["ndjson", "csv"] = Query("ndjson", description="Output format"),
+    since: Optional[datetime] = Query(None, description="Inclusive start (UTC)"),
+    until: Optional[datetime] = Query(None, description="Exclusive end (UTC)"),
+    action: Optional[List[AuditAction]] = Query(None, description="Only these actions (repeatable)")
+):
+    """
+    Stream audit rows in time order as NDJSON or CSV.
+    
+    Rows are read through a server-side cursor and sent as they arrive,
+    so exports of any size run in constant memory.
+    """
+    since, until = check_range(since, until)
+    
+    filename = "audit-{}-{}.{}".format(
+        since.strftime("%Y%m%dT%H%M%S") if since else "start",
+        until.strftime("%Y%m%dT%H%M%S") if until else "now",
+        format
+    )
+    
+    return StreamingResponse(
+        audit_exporter.stream(format, since, until, action),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
+@router.get("/search", response_model=AuditSearchResponse)
+async def search_audit_logs(
+    vid: Optional[str] = Query(None, pattern=r"^\d{12}$", description="12-digit VID (hashed server-side)"),
+    vid_hash: Optional[str] = Query(None, pattern=r"^[0-9a-f]{64}$", description="SHA-256 hash of the VID"),
+    since: Optional[datetime] = Query(None, description="Inclusive start (UTC)"),
+    until: Optional[datetime] = Query(None, description="Exclusive end (UTC)"),
+    limit: int = Query(100, ge=1, le=settings.audit_search_max_limit, description="Max records")
+):
+    """
+    Find a VID's audit records in both the database and the cold-tier archive.
+    
+    Archived days are searched through their sidecar indexes, so only the
+    blocks holding the VID are read.
+    """
+    if (vid is None) == (vid_hash is None):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Provide exactly one of vid or vid_hash"
+        )
+    since, until = check_range(since, until)
+    
+    vid_hash = vid_hash or hash_identifier(vid)
+    
+    # Archived days are older than anything still in the database
+    results = [
+        AuditLogItem(**row, source="archive")
+        for row in await audit_archive.search(vid_hash, since, until, limit)
+    ]
+    if len(results) < limit:
+        results += [
+            AuditLogItem(**row, source="hot")
+            for row in await audit_storage.search(vid_hash, since, until, limit - len(results))
+        ]
+    
+    return AuditSearchResponse(results=results, total=len(results))
+
+
+@router.get("/rollups", response_model=AuditRollupResponse)
+async def get_audit_rollups(
+    since: Optional[datetime] = Query(None, description="Inclusive start (UTC), default one hour ago"),
+    until: Optional[datetime] = Query(None, description="Exclusive end (UTC)")
+):
+    """
+    Per-minute audit event counts by action, for dashboards.
+    """
+    since = utc_naive(since) or datetime.utcnow() - timedelta(hours=1)
+    since, until = check_range(since, until)
+    
+    rollups = await audit_storage.rollups(since, until)
+    return AuditRollupResponse(rollups=[AuditRollupItem(**item) for item in rollups])
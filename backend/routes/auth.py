@@ -5,55 +5,183 @@ Authentication routes for user registration and login.
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from datetime import datetime
 
-from database import get_db
+from config import settings
+from database import get_db, get_read_db
 from models.user import User
-from schemas.user import UserCreate, UserLogin, TokenResponse, UserResponse
-from auth.password import hash_password, verify_password
-from auth.jwt_handler import create_access_token
+from models.token_version import UserTokenVersion
+from schemas.user import UserCreate, UserLogin, TokenResponse, UserResponse, RefreshRequest
+from auth.password import password_hasher, PasswordHasherBusy
+from auth.jwt_handler import create_access_token, create_refresh_token, decode_token, REFRESH
+from auth.principal_cache import principal_cache, Principal
+from auth.revocation import token_revocations
+from security.rate_limit import limit_auth
 
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 
+# Dialect INSERTs with ON CONFLICT support, for the token version upsert
+_UPSERTS = {
+    "postgresql": postgresql_insert,
+    "sqlite": sqlite_insert,
+}
+
 
 # OAuth2 scheme for token extraction
 from fastapi.security import OAuth2PasswordBearer
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
 
+def raise_invalid_token():
+    """
+    Reject a request whose token is invalid, expired or revoked.
+    """
+    raise HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Invalid or expired token",
+        headers={"WWW-Authenticate": "Bearer"}
+    )
+
+
+def select_user_with_version():
+    """``users`` row plus its token version (0 without a version row)."""
+    return select(User, UserTokenVersion.version).outerjoin(
+        UserTokenVersion, UserTokenVersion.user_id == User.id
+    )
+
+
 # Dependency for getting current user from JWT
 async def get_current_user(
     token: str = Depends(oauth2_scheme),
-    db: AsyncSession = Depends(get_db)
-) -> User:
+    db: AsyncSession = Depends(get_read_db)
+) -> Principal:
     """
     Dependency to get current authenticated user from JWT token.
+    
+    Served from the principal cache when possible. Otherwise a fully
+    verified user is authorized from the access token's claims alone;
+    only other tokens (unverified users, tokens without claims) read the
+    user row.
     """
-    from auth.jwt_handler import verify_token
+    cached = principal_cache.get(token)
+    if cached is not None:
+        return cached
     
-    user_id = verify_token(token)
-    if not user_id:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid or expired token",
-            headers={"WWW-Authenticate": "Bearer"}
-        )
+    payload = decode_token(token)
+    if not payload:
+        raise_invalid_token()
     
+    version = payload.get("ver", 0)
+    if token_revocations.is_revoked(payload["sub"], version):
+        raise_invalid_token()
+    
+    principal = Principal.from_claims(payload)
+    if principal is not None:
+        return principal
+    
+    cache_version = principal_cache.version
     result = await db.execute(
-        select(User).where(User.id == user_id)
+        select_user_with_version().where(User.id == payload["sub"])
     )
-    user = result.scalar_one_or_none()
+    row = result.one_or_none()
     
-    if not user:
+    if not row:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="User not found"
         )
     
-    return user
+    user, current_version = row
+    if version < (current_version or 0):
+        raise_invalid_token()
+    
+    principal = Principal.from_user(user)
 
+    # End the read transaction now so its connection goes back to the pool.
+    # Otherwise a cold-cache write request holds two connections (this one
+    # and get_db's) and a burst wider than the pool deadlocks on checkout.
+    await db.rollback()
 
-@router.post("/register", response_model=TokenResponse, status_code=status.HTTP_201_CREATED)
+    principal_cache.put(token, principal, token_exp=payload.get("exp"), version=cache_version)
+    
+    return principal
+
+
+async def require_admin(
+    current_user: Principal = Depends(get_current_user)
+) -> Principal:
+    """
+    Dependency restricting a route to the accounts listed in ``admin_emails``.
+    """
+    admins = {email.lower() for email in settings.admin_emails}
+    if current_user.email.lower() not in admins:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin access required"
+        )
+    return current_user
+
+
+def raise_auth_busy():
+    """
+    Reject an auth request because the password hashing pool is saturated.
+    """
+    raise HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Authentication service busy, please retry shortly",
+        headers={"Retry-After": "1"}
+    )
+
+
+def issue_tokens(user, token_version: int = 0) -> TokenResponse:
+    """
+    Issue an access/refresh token pair for a user.
+    
+    Args:
+        user: ``User`` row carrying the current verification flags
+        token_version: User's current token version
+    """
+    return TokenResponse(
+        access_token=create_access_token(user, token_version),
+        refresh_token=create_refresh_token(user.id, token_version),
+        expires_in=settings.access_token_expiry_minutes * 60,
+        user=UserResponse.model_validate(user)
+    )
+
+
+async def revoke_tokens(db: AsyncSession, user_id: str) -> int:
+    """
+    Revoke every access and refresh token issued to a user.
+    
+    Bumps the user's token version, commits, and records the new version
+    in this process's revocation table and principal cache.
+    
+    Returns:
+        The new token version
+    """
+    # One atomic upsert, so concurrent first revocations cannot both insert
+    upsert = _UPSERTS[db.get_bind().dialect.name](UserTokenVersion).values(user_id=user_id, version=1)
+    upsert = upsert.on_conflict_do_update(
+        index_elements=[UserTokenVersion.user_id],
+        set_={"version": UserTokenVersion.version + 1, "updated_at": datetime.utcnow()}
+    ).returning(UserTokenVersion.version)
+    version = (await db.execute(upsert)).scalar_one()
+    await db.commit()
+    
+    token_revocations.revoke(user_id, version)
+    principal_cache.invalidate(user_id)
+    return version
+
+
+@router.post(
+    "/register",
+    response_model=TokenResponse,
+    status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(limit_auth)]
+)
 async def register(
     user_data: UserCreate,
     db: AsyncSession = Depends(get_db)
@@ -62,7 +190,7 @@ async def register(
     Register a new user.
     
     Creates a new user account with email and password.
-    Returns JWT token for immediate authentication.
+    Returns JWT access and refresh tokens for immediate authentication.
     """
     # Check if email already exists
     result = await db.execute(
@@ -76,10 +204,16 @@ async def register(
             detail="Email already registered"
         )
     
+    # Hash password off the event loop
+    try:
+        password_hash = await password_hasher.hash(user_data.password)
+    except PasswordHasherBusy:
+        raise_auth_busy()
+    
     # Create new user
     new_user = User(
         email=user_data.email,
-        password_hash=hash_password(user_data.password),
+        password_hash=password_hash,
         name=user_data.name,
         aadhaar_verified=False,
         pan_verified=False
@@ -87,18 +221,12 @@ async def register(
     
     db.add(new_user)
     await db.commit()
-    await db.refresh(new_user)
+    # No refresh: every column is set client-side and expire_on_commit is off
     
-    # Generate access token
-    access_token = create_access_token(new_user.id)
-    
-    return TokenResponse(
-        access_token=access_token,
-        user=UserResponse.model_validate(new_user)
-    )
+    return issue_tokens(new_user)
 
 
-@router.post("/login", response_model=TokenResponse)
+@router.post("/login", response_model=TokenResponse, dependencies=[Depends(limit_auth)])
 async def login(
     credentials: UserLogin,
     db: AsyncSession = Depends(get_db)
@@ -106,43 +234,88 @@ async def login(
     """
     Login with email and password.
     
-    Returns JWT token for authentication.
+    Returns JWT access and refresh tokens for authentication.
     """
     # Find user by email
     result = await db.execute(
-        select(User).where(User.email == credentials.email)
+        select_user_with_version().where(User.email == credentials.email)
     )
-    user = result.scalar_one_or_none()
+    row = result.one_or_none()
     
-    if not user:
+    if not row:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid email or password"
         )
+    user, version = row
+    
+    # Verify password off the event loop
+    try:
+        password_ok = await password_hasher.verify(credentials.password, user.password_hash)
+    except PasswordHasherBusy:
+        raise_auth_busy()
     
-    # Verify password
-    if not verify_password(credentials.password, user.password_hash):
+    if not password_ok:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid email or password"
         )
     
-    # Generate access token
-    access_token = create_access_token(user.id)
+    return issue_tokens(user, version or 0)
+
+
+@router.post("/refresh", response_model=TokenResponse)
+async def refresh(
+    request: RefreshRequest,
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Exchange a refresh token for a new token pair.
     
-    return TokenResponse(
-        access_token=access_token,
-        user=UserResponse.model_validate(user)
+    The new access token carries the user's current verification flags,
+    so clients refresh after completing verification. Refresh tokens
+    issued before the user's tokens were revoked are rejected.
+    """
+    payload = decode_token(request.refresh_token, token_type=REFRESH)
+    if not payload:
+        raise_invalid_token()
+    
+    result = await db.execute(
+        select_user_with_version().where(User.id == payload["sub"])
     )
+    row = result.one_or_none()
+    if not row:
+        raise_invalid_token()
+    
+    user, version = row
+    version = version or 0
+    if payload.get("ver", 0) < version:
+        raise_invalid_token()
+    
+    return issue_tokens(user, version)
+
+
+@router.post("/revoke")
+async def revoke(
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Sign out everywhere: revoke all of the current user's tokens,
+    including the one making this request.
+    """
+    await revoke_tokens(db, current_user.id)
+    return {"success": True, "message": "All sessions revoked"}
 
 
 @router.get("/me", response_model=UserResponse)
 async def get_current_user_info(
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     """
     Get current user information.
     
-    Requires authentication.
+    Requires authentication. Answered from the access token's claims
+    once the user is fully verified.
     """
     return UserResponse.model_validate(current_user)
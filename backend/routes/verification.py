@@ -7,12 +7,14 @@ In production, these would integrate with official government APIs.
 
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import update
 
 from database import get_db
 from models.user import User
 from schemas.verification import AadhaarVerifyRequest, PANVerifyRequest, VerificationResponse
 from security.crypto import hash_identifier
 from routes.auth import get_current_user
+from auth.principal_cache import principal_cache, Principal
 
 
 router = APIRouter(prefix="/verify", tags=["Identity Verification"])
@@ -21,7 +23,7 @@ router = APIRouter(prefix="/verify", tags=["Identity Verification"])
 @router.post("/aadhaar", response_model=VerificationResponse)
 async def verify_aadhaar(
     request: AadhaarVerifyRequest,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
     """
@@ -50,12 +52,17 @@ async def verify_aadhaar(
     # Hash the Aadhaar number (NEVER store plaintext)
     aadhaar_hash = hash_identifier(request.aadhaar_number)
     
-    # Update user record
-    current_user.aadhaar_verified = True
-    current_user.aadhaar_hash = aadhaar_hash
-    
+    # Update user record (the principal is a cached snapshot, so write the row directly)
+    await db.execute(
+        update(User)
+        .where(User.id == current_user.id)
+        .values(aadhaar_verified=True, aadhaar_hash=aadhaar_hash)
+    )
     await db.commit()
     
+    # Cached principals for this user now carry stale flags
+    principal_cache.invalidate(current_user.id)
+    
     return VerificationResponse(
         success=True,
         message="Aadhaar verification successful (SIMULATED)",
@@ -66,7 +73,7 @@ async def verify_aadhaar(
 @router.post("/pan", response_model=VerificationResponse)
 async def verify_pan(
     request: PANVerifyRequest,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
     """
@@ -91,12 +98,17 @@ async def verify_pan(
     # Hash the PAN number (NEVER store plaintext)
     pan_hash = hash_identifier(request.pan_number)
     
-    # Update user record
-    current_user.pan_verified = True
-    current_user.pan_hash = pan_hash
-    
+    # Update user record (the principal is a cached snapshot, so write the row directly)
+    await db.execute(
+        update(User)
+        .where(User.id == current_user.id)
+        .values(pan_verified=True, pan_hash=pan_hash)
+    )
     await db.commit()
     
+    # Cached principals for this user now carry stale flags
+    principal_cache.invalidate(current_user.id)
+    
     return VerificationResponse(
         success=True,
         message="PAN verification successful (SIMULATED)",
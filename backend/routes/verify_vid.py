@@ -5,17 +5,28 @@ This endpoint is PUBLIC (no authentication required) and allows
 anyone to verify a VID or QR code to check identity verification status.
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status, Request
+from fastapi import APIRouter, Depends, HTTPException, status, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, update
 from datetime import datetime
+from typing import Dict, List, NamedTuple, Optional
+import enum
 
 from database import get_db
 from models.virtual_id import VirtualID
 from models.user import User
-from models.audit_log import AuditLog, AuditAction
-from schemas.virtual_id import VIDVerifyRequest, VIDVerifyResponse
-from security.crypto import verify_qr_payload, hash_identifier
+from models.audit_log import AuditAction
+from schemas.virtual_id import (
+    VIDVerifyRequest,
+    VIDVerifyResponse,
+    VIDBatchVerifyRequest,
+    VIDBatchVerifyResponse
+)
+from security.crypto import qr_verifier, QRRejection
+from security.vid_filter import vid_filter
+from security.vid_stats_cache import vid_stats_cache
+from security.rate_limit import rate_limiter, limit_verification, client_key
+from audit.writer import audit_writer
 
 
 router = APIRouter(tags=["VID Verification"])
@@ -56,7 +67,271 @@ def calculate_age_group(birth_year: int = None) -> str:
     return "18+"
 
 
-@router.post("/verify-vid", response_model=VIDVerifyResponse)
+class ConsumeReason(str, enum.Enum):
+    """Outcome of an attempt to consume a VID."""
+    OK = "ok"
+    NOT_FOUND = "not_found"
+    REVOKED = "revoked"
+    EXPIRED = "expired"
+    USED = "used"
+
+
+# Failure reason -> (audit action, audit result, response message)
+FAILURE_DETAILS = {
+    ConsumeReason.NOT_FOUND: (AuditAction.FAILED_VERIFICATION, "VID not found", "VID not found"),
+    ConsumeReason.REVOKED: (AuditAction.FAILED_VERIFICATION, "VID revoked", "VID has been revoked"),
+    ConsumeReason.EXPIRED: (AuditAction.EXPIRED, "VID expired", "VID has expired"),
+    ConsumeReason.USED: (AuditAction.FAILED_VERIFICATION, "VID usage limit reached", "VID has already been used"),
+}
+
+
+class ConsumeOutcome(NamedTuple):
+    """Result of consuming a VID. User fields are only set when reason is OK."""
+    reason: ConsumeReason
+    name: Optional[str] = None
+    aadhaar_verified: Optional[bool] = None
+    pan_verified: Optional[bool] = None
+    user_id: Optional[str] = None
+
+
+def _consume_statement(dialect_name: str, vids: List[str], now: datetime):
+    """
+    Build the conditional UPDATE ... RETURNING that consumes VIDs.
+    
+    Postgres joins users with UPDATE ... FROM. SQLite (>= 3.35) does not
+    allow FROM tables in RETURNING, so it reads the user columns through
+    correlated scalar subqueries instead.
+    """
+    vid_clause = VirtualID.vid == vids[0] if len(vids) == 1 else VirtualID.vid.in_(vids)
+    
+    stmt = (
+        update(VirtualID)
+        .where(
+            vid_clause,
+            VirtualID.revoked.is_(False),
+            VirtualID.expires_at > now,
+            VirtualID.usage_count < VirtualID.usage_limit
+        )
+        .values(usage_count=VirtualID.usage_count + 1)
+        .execution_options(synchronize_session=False)
+    )
+    
+    if dialect_name == "postgresql":
+        return (
+            stmt.where(User.id == VirtualID.user_id)
+            .returning(
+                VirtualID.vid,
+                VirtualID.user_id,
+                User.name,
+                User.aadhaar_verified,
+                User.pan_verified
+            )
+        )
+    
+    def user_column(column):
+        return select(column).where(User.id == VirtualID.user_id).scalar_subquery()
+    
+    return stmt.returning(
+        VirtualID.vid,
+        VirtualID.user_id,
+        user_column(User.name),
+        user_column(User.aadhaar_verified),
+        user_column(User.pan_verified)
+    )
+
+
+async def consume_vids(db: AsyncSession, vids: List[str]) -> List[ConsumeOutcome]:
+    """
+    Check and consume a set of VIDs with set-based statements.
+    
+    The validity checks live in the UPDATE's WHERE clause, so concurrent
+    scans of a one-time VID cannot both succeed. A single VID takes one
+    round trip on success; VIDs that were not updated are read back
+    together (status columns only) to report why.
+    
+    A VID listed more than once is consumed once per occurrence: the n-th
+    occurrences of every VID are handled by the n-th UPDATE.
+    
+    The caller owns the transaction and must commit.
+    
+    Args:
+        db: Database session
+        vids: Virtual IDs to consume, duplicates allowed
+        
+    Returns:
+        One ConsumeOutcome per input VID, in input order
+    """
+    now = datetime.utcnow()
+    dialect_name = db.bind.dialect.name
+    outcomes: List[Optional[ConsumeOutcome]] = [None] * len(vids)
+    
+    # Positions of each VID's occurrences, in order
+    positions: Dict[str, List[int]] = {}
+    for index, vid in enumerate(vids):
+        positions.setdefault(vid, []).append(index)
+    
+    failed = set()
+    pending = list(positions)
+    round_index = 0
+    while pending:
+        result = await db.execute(_consume_statement(dialect_name, pending, now))
+        consumed = set()
+        for vid, user_id, name, aadhaar_verified, pan_verified in result.all():
+            consumed.add(vid)
+            outcomes[positions[vid][round_index]] = ConsumeOutcome(
+                reason=ConsumeReason.OK,
+                name=name,
+                aadhaar_verified=aadhaar_verified,
+                pan_verified=pan_verified,
+                user_id=user_id
+            )
+        
+        failed.update(vid for vid in pending if vid not in consumed)
+        round_index += 1
+        pending = [vid for vid in consumed if len(positions[vid]) > round_index]
+    
+    if failed:
+        statuses = await _fetch_statuses(db, list(failed))
+        for vid in failed:
+            outcome = classify_failure(statuses.get(vid), now)
+            for index in positions[vid]:
+                if outcomes[index] is None:
+                    outcomes[index] = outcome
+    
+    return outcomes
+
+
+async def consume_vid(db: AsyncSession, vid: str) -> ConsumeOutcome:
+    """
+    Check and consume a single VID. See consume_vids.
+    
+    Args:
+        db: Database session
+        vid: Virtual ID to consume
+        
+    Returns:
+        ConsumeOutcome with the masked-name source and verification flags on success
+    """
+    outcomes = await consume_vids(db, [vid])
+    return outcomes[0]
+
+
+async def _fetch_statuses(db: AsyncSession, vids: List[str]) -> Dict[str, tuple]:
+    vid_clause = VirtualID.vid == vids[0] if len(vids) == 1 else VirtualID.vid.in_(vids)
+    result = await db.execute(
+        select(
+            VirtualID.vid,
+            VirtualID.revoked,
+            VirtualID.expires_at,
+            VirtualID.usage_count,
+            VirtualID.usage_limit
+        ).where(vid_clause)
+    )
+    return {row[0]: tuple(row[1:]) for row in result.all()}
+
+
+def classify_failure(status_row, now: datetime) -> ConsumeOutcome:
+    """
+    Explain why a VID could not be consumed.
+    
+    Checks run in the same order as the original route: revoked, then
+    expired, then used.
+    """
+    if status_row is None:
+        return ConsumeOutcome(ConsumeReason.NOT_FOUND)
+    
+    revoked, expires_at, usage_count, usage_limit = status_row
+    if revoked:
+        return ConsumeOutcome(ConsumeReason.REVOKED)
+    if now >= expires_at:
+        return ConsumeOutcome(ConsumeReason.EXPIRED)
+    if usage_count >= usage_limit:
+        return ConsumeOutcome(ConsumeReason.USED)
+    
+    # Row became valid-looking after the UPDATE missed it (e.g. a
+    # concurrent writer); treat it as already used rather than retry
+    return ConsumeOutcome(ConsumeReason.USED)
+
+
+def failure_response(vid: str, reason: ConsumeReason, ip: Optional[str]) -> VIDVerifyResponse:
+    """Queue the audit entry for a failed verification and build its response."""
+    action, audit_result, message = FAILURE_DETAILS[reason]
+    audit_writer.record(vid, action, audit_result, ip=ip)
+    
+    return VIDVerifyResponse(
+        valid=False,
+        message=message
+    )
+
+
+def success_response(vid: str, outcome: ConsumeOutcome, ip: Optional[str]) -> VIDVerifyResponse:
+    """Queue the audit entry for a successful verification and build its response."""
+    audit_writer.record(
+        vid,
+        AuditAction.VERIFIED,
+        "VID verified successfully",
+        ip=ip
+    )
+    
+    # Return minimal user information
+    return VIDVerifyResponse(
+        valid=True,
+        message="VID verified successfully",
+        name=mask_name(outcome.name),
+        age_group=calculate_age_group(),
+        aadhaar_verified=outcome.aadhaar_verified,
+        pan_verified=outcome.pan_verified
+    )
+
+
+def unreadable_token_response(token: str) -> VIDVerifyResponse:
+    """
+    Reject a compact QR token that does not even decode to a VID.
+    
+    There is no VID to audit against, so only the verifier counter records it.
+    """
+    _, error_msg = qr_verifier.check(token)
+    return VIDVerifyResponse(
+        valid=False,
+        message=f"Invalid QR code: {error_msg}"
+    )
+
+
+async def precheck(request: VIDVerifyRequest, vid: str, ip: Optional[str]) -> Optional[VIDVerifyResponse]:
+    """
+    Checks that need no database: QR signature and expiry. The VID filter
+    runs separately, so a batch can check all its VIDs at once.
+    
+    Returns:
+        A failure response if the request can be rejected now, else None
+    """
+    # If QR payload provided, verify signature and signed expiry
+    if request.qr_payload:
+        rejection, error_msg = qr_verifier.check(request.qr_payload)
+        if rejection == QRRejection.EXPIRED:
+            return failure_response(vid, ConsumeReason.EXPIRED, ip)
+        if rejection is not None:
+            # Log failed verification
+            audit_writer.record(
+                vid,
+                AuditAction.FAILED_VERIFICATION,
+                f"Invalid QR signature: {error_msg}",
+                ip=ip
+            )
+            
+            return VIDVerifyResponse(
+                valid=False,
+                message=f"Invalid QR code: {error_msg}"
+            )
+    
+    return None
+
+
+@router.post(
+    "/verify-vid",
+    response_model=VIDVerifyResponse,
+    dependencies=[Depends(limit_verification)]
+)
 async def verify_vid(
     request: VIDVerifyRequest,
     req: Request,
@@ -68,16 +343,20 @@ async def verify_vid(
     PUBLIC ENDPOINT - No authentication required.
     
     This endpoint:
-    1. Verifies QR signature (if QR code provided)
-    2. Checks VID validity (expiry, usage, revocation)
+    1. Verifies QR signature and signed expiry (if QR code provided)
+    2. Checks VID validity and increments the usage counter in a
+       single conditional UPDATE (see consume_vid)
     3. Returns minimal user information if valid
-    4. Increments usage counter
-    5. Creates audit log
+    4. Queues an audit log entry
     
-    Rate limited to prevent abuse.
+    Rate limited per client IP (rate_limit_verification).
     """
     # Extract VID
     vid = request.get_vid()
+    ip = req.client.host
+    
+    if not vid and isinstance(request.qr_payload, str):
+        return unreadable_token_response(request.qr_payload)
     
     if not vid:
         raise HTTPException(
@@ -85,128 +364,105 @@ async def verify_vid(
             detail="Either 'vid' or 'qr_payload' must be provided"
         )
     
-    # If QR payload provided, verify signature
-    if request.qr_payload:
-        is_valid, error_msg = verify_qr_payload(request.qr_payload)
-        if not is_valid:
-            # Log failed verification
-            audit_log = AuditLog(
-                vid_hash=hash_identifier(vid),
-                ip_hash=hash_identifier(req.client.host),
-                action=AuditAction.FAILED_VERIFICATION,
-                result=f"Invalid QR signature: {error_msg}"
-            )
-            db.add(audit_log)
-            await db.commit()
-            
-            return VIDVerifyResponse(
-                valid=False,
-                message=f"Invalid QR code: {error_msg}"
-            )
+    rejected = await precheck(request, vid, ip)
+    if rejected is not None:
+        return rejected
     
-    # Find VID in database
-    result = await db.execute(
-        select(VirtualID).where(VirtualID.vid == vid)
-    )
-    vid_record = result.scalar_one_or_none()
-    
-    if not vid_record:
-        # Log failed verification
-        audit_log = AuditLog(
-            vid_hash=hash_identifier(vid),
-            ip_hash=hash_identifier(req.client.host),
-            action=AuditAction.FAILED_VERIFICATION,
-            result="VID not found"
-        )
-        db.add(audit_log)
-        await db.commit()
-        
-        return VIDVerifyResponse(
-            valid=False,
-            message="VID not found"
-        )
+    # Never-issued VIDs are answered from memory
+    if not await vid_filter.check(vid):
+        return failure_response(vid, ConsumeReason.NOT_FOUND, ip)
     
-    # Check if revoked
-    if vid_record.revoked:
-        audit_log = AuditLog(
-            vid_hash=hash_identifier(vid),
-            ip_hash=hash_identifier(req.client.host),
-            action=AuditAction.FAILED_VERIFICATION,
-            result="VID revoked"
-        )
-        db.add(audit_log)
-        await db.commit()
-        
-        return VIDVerifyResponse(
-            valid=False,
-            message="VID has been revoked"
-        )
+    # Atomically check and consume the VID
+    outcome = await consume_vid(db, vid)
     
-    # Check if expired
-    if datetime.utcnow() > vid_record.expires_at:
-        audit_log = AuditLog(
-            vid_hash=hash_identifier(vid),
-            ip_hash=hash_identifier(req.client.host),
-            action=AuditAction.EXPIRED,
-            result="VID expired"
-        )
-        db.add(audit_log)
-        await db.commit()
+    if outcome.reason != ConsumeReason.OK:
+        if outcome.reason == ConsumeReason.NOT_FOUND:
+            vid_filter.record_false_positive()
         
-        return VIDVerifyResponse(
-            valid=False,
-            message="VID has expired"
-        )
+        # Nothing was written, so there is no transaction to commit
+        return failure_response(vid, outcome.reason, ip)
     
-    # Check usage limit
-    if vid_record.usage_count >= vid_record.usage_limit:
-        audit_log = AuditLog(
-            vid_hash=hash_identifier(vid),
-            ip_hash=hash_identifier(req.client.host),
-            action=AuditAction.FAILED_VERIFICATION,
-            result="VID usage limit reached"
-        )
-        db.add(audit_log)
-        await db.commit()
-        
-        return VIDVerifyResponse(
-            valid=False,
-            message="VID has already been used"
-        )
+    await db.commit()
+    vid_stats_cache.invalidate(outcome.user_id)
     
-    # VID is valid - get user information
-    result = await db.execute(
-        select(User).where(User.id == vid_record.user_id)
-    )
-    user = result.scalar_one_or_none()
+    return success_response(vid, outcome, ip)
+
+
+@router.post(
+    "/verify-vid/batch",
+    response_model=VIDBatchVerifyResponse
+)
+async def verify_vid_batch(
+    request: VIDBatchVerifyRequest,
+    req: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Verify many Virtual IDs or QR codes in one call.
     
-    if not user:
-        # Should never happen, but handle gracefully
-        return VIDVerifyResponse(
-            valid=False,
-            message="User not found"
-        )
+    PUBLIC ENDPOINT - No authentication required.
     
-    # Increment usage counter
-    vid_record.usage_count += 1
+    Intended for high-volume gate scanners. Each item is checked exactly
+    as by /verify-vid, but all VIDs are resolved and consumed with
+    set-based statements in a single transaction. Results are returned
+    in request order; a bad item never fails the whole batch.
     
-    # Create audit log
-    audit_log = AuditLog(
-        vid_hash=hash_identifier(vid),
-        ip_hash=hash_identifier(req.client.host),
-        action=AuditAction.VERIFIED,
-        result="VID verified successfully"
-    )
-    db.add(audit_log)
+    Each item counts against the per-IP verification limit, so a batch
+    is no way around it; scanners need a correspondingly higher
+    ``rate_limit_verification``.
+    """
+    await rate_limiter.enforce("verification", [client_key(req)], response, cost=len(request.items))
     
-    await db.commit()
+    ip = req.client.host
+    results: List[Optional[VIDVerifyResponse]] = [None] * len(request.items)
     
-    # Return minimal user information
-    return VIDVerifyResponse(
-        valid=True,
-        message="VID verified successfully",
-        name=mask_name(user.name),
-        age_group=calculate_age_group(),
-        aadhaar_verified=user.aadhaar_verified,
-        pan_verified=user.pan_verified
-    )
+    # Stateless checks first; collect the VIDs that need the database
+    to_consume: List[int] = []
+    for index, item in enumerate(request.items):
+        vid = item.get_vid()
+        if not vid and isinstance(item.qr_payload, str):
+            results[index] = unreadable_token_response(item.qr_payload)
+            continue
+        if not vid:
+            results[index] = VIDVerifyResponse(
+                valid=False,
+                message="Either 'vid' or 'qr_payload' must be provided"
+            )
+            continue
+        
+        rejected = await precheck(item, vid, ip)
+        if rejected is not None:
+            results[index] = rejected
+            continue
+        
+        to_consume.append(index)
+    
+    # Never-issued VIDs are answered from memory, with one multi-worker
+    # catch-up for the whole batch
+    vids = [request.items[index].get_vid() for index in to_consume]
+    known = await vid_filter.check_many(vids)
+    for index, vid, maybe in zip(to_consume, vids, known):
+        if not maybe:
+            results[index] = failure_response(vid, ConsumeReason.NOT_FOUND, ip)
+    to_consume = [index for index, maybe in zip(to_consume, known) if maybe]
+    
+    if to_consume:
+        vids = [request.items[index].get_vid() for index in to_consume]
+        outcomes = await consume_vids(db, vids)
+        
+        consumed_by = {outcome.user_id for outcome in outcomes if outcome.reason == ConsumeReason.OK}
+        if consumed_by:
+            await db.commit()
+            for user_id in consumed_by:
+                vid_stats_cache.invalidate(user_id)
+        
+        for index, vid, outcome in zip(to_consume, vids, outcomes):
+            if outcome.reason == ConsumeReason.OK:
+                results[index] = success_response(vid, outcome, ip)
+            else:
+                if outcome.reason == ConsumeReason.NOT_FOUND:
+                    vid_filter.record_false_positive()
+                results[index] = failure_response(vid, outcome.reason, ip)
+    
+    return VIDBatchVerifyResponse(results=results)
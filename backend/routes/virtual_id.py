@@ -1,46 +1,63 @@
 """
 Virtual ID management routes.
 
-Handles VID generation, listing, and revocation.
+Handles VID generation (single and batch), listing, summary counts, and revocation.
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, insert, tuple_, func, case
+from sqlalchemy.exc import IntegrityError
 from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+import base64
 
-from database import get_db
-from models.user import User
-from models.virtual_id import VirtualID
-from models.audit_log import AuditLog, AuditAction
-from schemas.virtual_id import VIDGenerateResponse, VIDListResponse, VIDItem
-from security.crypto import generate_vid, generate_qr_payload, hash_identifier
+from database import get_db, get_read_db
+from models.virtual_id import VirtualID, VIDStatus
+from models.audit_log import AuditAction
+from schemas.virtual_id import (
+    VIDGenerateResponse,
+    VIDBatchGenerateResponse,
+    VIDListResponse,
+    VIDItem,
+    VIDStatsResponse
+)
+from security.crypto import generate_vid, generate_qr_payload, generate_qr_token
 from routes.auth import get_current_user
+from auth.principal_cache import Principal
+from audit.writer import audit_writer
+from security.vid_filter import vid_filter
+from security.vid_stats_cache import vid_stats_cache
+from security.rate_limit import rate_limiter, client_key
 from config import settings
 
 
 router = APIRouter(prefix="/vid", tags=["Virtual ID Management"])
 
+# Redraws allowed when a concurrent insert claims one of our VIDs
+MAX_ISSUE_ATTEMPTS = 3
 
-@router.post("/generate", response_model=VIDGenerateResponse, status_code=status.HTTP_201_CREATED)
-async def generate_virtual_id(
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+
+def generation_keys(request: Request, current_user: Principal) -> List[str]:
+    """Rate limit keys for VID generation: the user and the client IP."""
+    return [f"user:{current_user.id}", client_key(request)]
+
+
+async def limit_generation(
+    request: Request,
+    response: Response,
+    current_user: Principal = Depends(get_current_user)
 ):
     """
-    Generate a new Virtual ID.
-    
-    Requirements:
-    - User must be authenticated
-    - User must have verified Aadhaar
-    - User must have verified PAN
-    
-    Returns:
-    - 12-digit VID
-    - Signed QR code payload
-    - Expiry timestamp
+    Dependency: limit VID generation per user and per client IP.
+    """
+    await rate_limiter.enforce("generation", generation_keys(request, current_user), response)
+
+
+def require_verified_identity(current_user: Principal):
+    """
+    Ensure the user may generate VIDs (Aadhaar and PAN verified).
     """
-    # Check verification status
     if not current_user.aadhaar_verified:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -52,83 +69,351 @@ async def generate_virtual_id(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="PAN verification required before generating VID"
         )
+
+
+async def draw_unique_vids(db: AsyncSession, count: int) -> List[str]:
+    """
+    Draw ``count`` VIDs that are not already in use.
     
-    # Generate unique VID
-    vid = generate_vid()
+    Candidates are checked against the table with one set-membership
+    query per round; only colliding candidates are redrawn and rechecked.
+    """
+    vids: List[str] = []
+    seen = set()
     
-    # Ensure VID is unique (very unlikely collision, but check anyway)
-    result = await db.execute(
-        select(VirtualID).where(VirtualID.vid == vid)
-    )
-    existing_vid = result.scalar_one_or_none()
+    while len(vids) < count:
+        candidates = []
+        while len(candidates) < count - len(vids):
+            vid = generate_vid()
+            if vid not in seen:
+                seen.add(vid)
+                candidates.append(vid)
+        
+        result = await db.execute(
+            select(VirtualID.vid).where(VirtualID.vid.in_(candidates))
+        )
+        taken = set(result.scalars().all())
+        vids.extend(vid for vid in candidates if vid not in taken)
     
-    if existing_vid:
-        # Regenerate if collision (extremely rare)
-        vid = generate_vid()
+    return vids
+
+
+async def issue_vids(db: AsyncSession, user_id: str, count: int) -> Tuple[List[str], datetime]:
+    """
+    Create ``count`` VIDs for a user with one bulk INSERT and commit.
     
-    # Calculate expiry
-    expires_at = datetime.utcnow() + timedelta(minutes=settings.vid_expiry_minutes)
+    A concurrent request can still claim a candidate between the
+    membership check and the insert; the primary key rejects that and the
+    whole batch is redrawn.
     
-    # Create VID record
-    new_vid = VirtualID(
-        vid=vid,
-        user_id=current_user.id,
-        expires_at=expires_at,
-        usage_limit=settings.vid_usage_limit
-    )
+    Returns:
+        Tuple of (VIDs, shared expiry timestamp)
+    """
+    for attempt in range(MAX_ISSUE_ATTEMPTS):
+        vids = await draw_unique_vids(db, count)
+        
+        # Calculate expiry
+        now = datetime.utcnow()
+        expires_at = now + timedelta(minutes=settings.vid_expiry_minutes)
+        
+        await db.execute(
+            insert(VirtualID),
+            [
+                {
+                    "vid": vid,
+                    "user_id": user_id,
+                    "created_at": now,
+                    "expires_at": expires_at,
+                    "usage_limit": settings.vid_usage_limit,
+                    "usage_count": 0,
+                    "revoked": False
+                }
+                for vid in vids
+            ]
+        )
+        
+        # Register before commit so the VIDs are never filtered out once visible
+        for vid in vids:
+            vid_filter.add(vid, now)
+        
+        if vid_filter.too_late(now):
+            # Other workers' filters may already have caught up past ``now``;
+            # committing could hide these VIDs from them, so redraw
+            await db.rollback()
+            if attempt == MAX_ISSUE_ATTEMPTS - 1:
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="VID generation timed out, please retry",
+                    headers={"Retry-After": "1"}
+                )
+            continue
+        
+        try:
+            await db.commit()
+        except IntegrityError:
+            await db.rollback()
+            if attempt == MAX_ISSUE_ATTEMPTS - 1:
+                raise
+            continue
+        
+        vid_stats_cache.invalidate(user_id)
+        
+        # Create audit logs
+        for vid in vids:
+            audit_writer.record(vid, AuditAction.CREATED, "VID created successfully")
+        
+        return vids, expires_at
+
+
+@router.post(
+    "/generate",
+    response_model=VIDGenerateResponse,
+    status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(limit_generation)]
+)
+async def generate_virtual_id(
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Generate a new Virtual ID.
     
-    db.add(new_vid)
+    Requirements:
+    - User must be authenticated
+    - User must have verified Aadhaar
+    - User must have verified PAN
     
-    # Create audit log
-    audit_log = AuditLog(
-        vid_hash=hash_identifier(vid),
-        action=AuditAction.CREATED,
-        result="VID created successfully"
-    )
-    db.add(audit_log)
+    Returns:
+    - 12-digit VID
+    - Signed QR code payload
+    - Expiry timestamp
+    """
+    # Check verification status
+    require_verified_identity(current_user)
     
-    await db.commit()
+    # Generate unique VID
+    vids, expires_at = await issue_vids(db, current_user.id, 1)
+    vid = vids[0]
     
     # Generate signed QR payload
     qr_payload = generate_qr_payload(vid, expires_at)
+    qr_token = generate_qr_token(vid, expires_at)
     
     return VIDGenerateResponse(
         vid=vid,
         qr_payload=qr_payload,
+        qr_token=qr_token,
         expires_at=expires_at,
         usage_limit=settings.vid_usage_limit
     )
 
 
+@router.post(
+    "/generate-batch",
+    response_model=VIDBatchGenerateResponse,
+    status_code=status.HTTP_201_CREATED
+)
+async def generate_virtual_id_batch(
+    request: Request,
+    response: Response,
+    count: int = Query(..., ge=1, le=settings.generate_batch_max_count, description="Number of VIDs to generate"),
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Generate several Virtual IDs at once for offline use.
+    
+    Same requirements as /vid/generate. All VIDs share one expiry and are
+    written with a single bulk INSERT.
+    
+    Returns:
+    - One VID with its signed QR payload per requested VID
+    
+    Every VID counts against the generation rate limit, so a batch costs
+    as much as ``count`` single calls.
+    """
+    await rate_limiter.enforce("generation", generation_keys(request, current_user), response, cost=count)
+    
+    # Check verification status
+    require_verified_identity(current_user)
+    
+    vids, expires_at = await issue_vids(db, current_user.id, count)
+    
+    return VIDBatchGenerateResponse(
+        vids=[
+            VIDGenerateResponse(
+                vid=vid,
+                qr_payload=generate_qr_payload(vid, expires_at),
+                qr_token=generate_qr_token(vid, expires_at),
+                expires_at=expires_at,
+                usage_limit=settings.vid_usage_limit
+            )
+            for vid in vids
+        ],
+        total=len(vids)
+    )
+
+
+def encode_cursor(created_at: datetime, vid: str) -> str:
+    """Opaque keyset cursor for the row a page ended on."""
+    raw = f"{created_at.isoformat()}|{vid}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    """
+    Decode a keyset cursor.
+    
+    Raises:
+        HTTPException: 400 if the cursor is malformed
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, vid = raw.split("|", 1)
+        return datetime.fromisoformat(created_at), vid
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+
+# Only the columns VIDItem needs; rows skip ORM object hydration entirely
+LIST_COLUMNS = (
+    VirtualID.vid,
+    VirtualID.created_at,
+    VirtualID.expires_at,
+    VirtualID.usage_count,
+    VirtualID.usage_limit,
+    VirtualID.revoked,
+)
+
+
 @router.get("/list", response_model=VIDListResponse)
 async def list_virtual_ids(
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    limit: int = Query(50, ge=1, le=settings.vid_list_max_limit, description="Page size"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    status_filter: Optional[VIDStatus] = Query(None, alias="status", description="Only VIDs in this state"),
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
-    List all VIDs for the current user.
+    List the current user's VIDs, newest first, one page at a time.
     
-    Returns both active and expired/used VIDs for user's reference.
+    Uses keyset pagination on (created_at, vid) served by the
+    (user_id, created_at, vid) index, so every page costs the same no
+    matter how deep. Pass ``next_cursor`` back as ``cursor`` for the next
+    page; it is null on the last page. ``total`` counts all of the
+    user's VIDs (taken from the /vid/stats cache when it is warm) and
+    ``count`` the VIDs in this page.
     """
-    result = await db.execute(
-        select(VirtualID)
+    now = datetime.utcnow()
+    query = (
+        select(*LIST_COLUMNS)
         .where(VirtualID.user_id == current_user.id)
-        .order_by(VirtualID.created_at.desc())
+        .order_by(VirtualID.created_at.desc(), VirtualID.vid.desc())
+        .limit(limit + 1)
     )
-    vids = result.scalars().all()
     
-    vid_items = [VIDItem.model_validate(vid) for vid in vids]
+    if cursor:
+        cursor_created_at, cursor_vid = decode_cursor(cursor)
+        query = query.where(
+            tuple_(VirtualID.created_at, VirtualID.vid) < tuple_(cursor_created_at, cursor_vid)
+        )
+    
+    if status_filter:
+        query = query.where(VirtualID.status_condition(status_filter, now))
+    
+    result = await db.execute(query)
+    rows = result.all()
+    
+    # The extra row only tells us whether another page exists
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].created_at, rows[-1].vid)
+    
+    vid_items = [
+        VIDItem(
+            **row._mapping,
+            is_valid=(
+                not row.revoked
+                and now <= row.expires_at
+                and row.usage_count < row.usage_limit
+            )
+        )
+        for row in rows
+    ]
+    
+    cached = vid_stats_cache.get(current_user.id)
+    if cached is not None:
+        total = cached.total
+    else:
+        total = await db.scalar(
+            select(func.count()).select_from(VirtualID).where(VirtualID.user_id == current_user.id)
+        )
     
     return VIDListResponse(
         vids=vid_items,
-        total=len(vid_items)
+        total=total,
+        count=len(vid_items),
+        next_cursor=next_cursor
     )
 
 
+@router.get("/stats", response_model=VIDStatsResponse)
+async def get_vid_stats(
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Count the current user's VIDs by state.
+    
+    One aggregate query over the user's rows (via the user_id index)
+    instead of shipping the whole history to the client.
+    """
+    cached = vid_stats_cache.get(current_user.id)
+    if cached is not None:
+        return cached
+    
+    now = datetime.utcnow()
+    
+    def count_where(state: VIDStatus):
+        return func.coalesce(func.sum(case((VirtualID.status_condition(state, now), 1), else_=0)), 0)
+    
+    result = await db.execute(
+        select(
+            func.count(),
+            count_where(VIDStatus.ACTIVE),
+            count_where(VIDStatus.EXPIRED),
+            count_where(VIDStatus.USED),
+            count_where(VIDStatus.REVOKED),
+            func.coalesce(func.sum(VirtualID.usage_count), 0),
+            # Earliest moment an active VID turns expired
+            func.min(case((VirtualID.status_condition(VIDStatus.ACTIVE, now), VirtualID.expires_at)))
+        ).where(VirtualID.user_id == current_user.id)
+    )
+    total, active, expired, used, revoked, verifications, next_expiry = result.one()
+    
+    stats = VIDStatsResponse(
+        total=total,
+        active=active,
+        expired=expired,
+        used=used,
+        revoked=revoked,
+        verifications=verifications
+    )
+    
+    valid_for = (next_expiry - now).total_seconds() if next_expiry else float("inf")
+    vid_stats_cache.put(current_user.id, stats, valid_for)
+    
+    return stats
+
+
 @router.post("/revoke/{vid}")
 async def revoke_virtual_id(
     vid: str,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
     """
@@ -160,15 +445,11 @@ async def revoke_virtual_id(
     # Revoke VID
     vid_record.revoked = True
     
-    # Create audit log
-    audit_log = AuditLog(
-        vid_hash=hash_identifier(vid),
-        action=AuditAction.REVOKED,
-        result="VID revoked by user"
-    )
-    db.add(audit_log)
-    
     await db.commit()
+    vid_stats_cache.invalidate(current_user.id)
+    
+    # Create audit log
+    audit_writer.record(vid, AuditAction.REVOKED, "VID revoked by user")
     
     return {
         "success": True,
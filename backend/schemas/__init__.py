@@ -4,11 +4,17 @@ from schemas.user import UserCreate, UserLogin, UserResponse
 from schemas.verification import AadhaarVerifyRequest, PANVerifyRequest, VerificationResponse
 from schemas.virtual_id import (
     VIDGenerateResponse,
+    VIDBatchGenerateResponse,
     VIDVerifyRequest,
     VIDVerifyResponse,
+    VIDBatchVerifyRequest,
+    VIDBatchVerifyResponse,
     VIDListResponse,
-    VIDItem
+    VIDItem,
+    VIDStatsResponse
 )
+from schemas.audit import AuditRollupItem, AuditRollupResponse, AuditLogItem, AuditSearchResponse
+from schemas.admin import ProfileCapture, ProfileListResponse
 
 __all__ = [
     "UserCreate",
@@ -18,8 +24,18 @@ __all__ = [
     "PANVerifyRequest",
     "VerificationResponse",
     "VIDGenerateResponse",
+    "VIDBatchGenerateResponse",
     "VIDVerifyRequest",
     "VIDVerifyResponse",
+    "VIDBatchVerifyRequest",
+    "VIDBatchVerifyResponse",
     "VIDListResponse",
-    "VIDItem"
+    "VIDItem",
+    "VIDStatsResponse",
+    "AuditRollupItem",
+    "AuditRollupResponse",
+    "AuditLogItem",
+    "AuditSearchResponse",
+    "ProfileCapture",
+    "ProfileListResponse"
 ]
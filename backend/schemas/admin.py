@@ -0,0 +1,25 @@
+"""
+Pydantic schemas for admin diagnostics endpoints.
+"""
+
+from pydantic import BaseModel, Field
+from datetime import datetime
+from typing import Optional
+
+
+class ProfileCapture(BaseModel):
+    """Schema for one profiled request."""
+    id: str = Field(..., description="Capture ID (also the file name stem)")
+    method: str
+    path: str
+    route: Optional[str] = Field(None, description="Matched route template")
+    status: int = Field(..., description="Response status code")
+    duration_ms: float = Field(..., description="Wall time under the profiler")
+    created_at: datetime
+    trace_memory: bool = Field(..., description="Whether top allocations were recorded")
+
+
+class ProfileListResponse(BaseModel):
+    """Schema for recent profile captures."""
+    captures: list[ProfileCapture] = Field(..., description="Newest first")
+    total: int
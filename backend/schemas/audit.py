@@ -0,0 +1,37 @@
+"""
+Pydantic schemas for admin audit endpoints.
+"""
+
+from pydantic import BaseModel, Field
+from datetime import datetime
+from typing import Literal, Optional
+from models.audit_log import AuditAction
+
+
+class AuditRollupItem(BaseModel):
+    """Schema for one per-minute audit count."""
+    minute: datetime = Field(..., description="Minute the events fall in (UTC)")
+    action: AuditAction = Field(..., description="Audit action")
+    count: int = Field(..., description="Events with this action in the minute")
+
+
+class AuditRollupResponse(BaseModel):
+    """Schema for per-minute audit counts."""
+    rollups: list[AuditRollupItem] = Field(..., description="Counts ordered by minute")
+
+
+class AuditLogItem(BaseModel):
+    """Schema for one audit record from the hot table or the archive."""
+    id: int
+    timestamp: datetime
+    action: AuditAction
+    vid_hash: str
+    ip_hash: Optional[str] = None
+    result: str
+    source: Literal["hot", "archive"] = Field(..., description="Database or cold-tier archive")
+
+
+class AuditSearchResponse(BaseModel):
+    """Schema for audit search results."""
+    results: list[AuditLogItem] = Field(..., description="Records ordered oldest first")
+    total: int = Field(..., description="Number of records returned")
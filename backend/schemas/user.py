@@ -33,5 +33,12 @@ class UserResponse(BaseModel):
 class TokenResponse(BaseModel):
     """Schema for authentication token response."""
     access_token: str = Field(..., description="JWT access token")
+    refresh_token: str = Field(..., description="JWT refresh token for /auth/refresh")
     token_type: str = Field(default="bearer", description="Token type")
+    expires_in: int = Field(..., description="Access token lifetime in seconds")
     user: UserResponse = Field(..., description="User information")
+
+
+class RefreshRequest(BaseModel):
+    """Schema for exchanging a refresh token for new tokens."""
+    refresh_token: str = Field(..., description="Refresh token from login, register or a previous refresh")
@@ -4,26 +4,41 @@ Pydantic schemas for Virtual ID operations.
 
 from pydantic import BaseModel, Field
 from datetime import datetime
-from typing import Optional, Dict
+from typing import Optional, Dict, Union
+from config import settings
+from security.crypto import decode_qr_token
 
 
 class VIDGenerateResponse(BaseModel):
     """Schema for VID generation response."""
     vid: str = Field(..., description="12-digit Virtual ID")
     qr_payload: Dict[str, str] = Field(..., description="Signed QR code payload")
+    qr_token: str = Field(..., description="Compact signed QR token (base64url) for smaller QR codes")
     expires_at: datetime = Field(..., description="Expiry timestamp")
     usage_limit: int = Field(..., description="Maximum number of uses")
 
 
+class VIDBatchGenerateResponse(BaseModel):
+    """Schema for batch VID generation response."""
+    vids: list[VIDGenerateResponse] = Field(..., description="Generated VIDs with signed QR payloads")
+    total: int = Field(..., description="Number of VIDs generated")
+
+
 class VIDVerifyRequest(BaseModel):
     """Schema for VID verification request."""
     vid: Optional[str] = Field(None, description="12-digit VID (if manual entry)")
-    qr_payload: Optional[Dict[str, str]] = Field(None, description="QR code payload (if scanned)")
+    qr_payload: Optional[Union[Dict[str, str], str]] = Field(
+        None,
+        description="QR code payload (if scanned): the signed JSON dict or a compact QR token"
+    )
     
     def get_vid(self) -> Optional[str]:
         """Extract VID from either direct input or QR payload."""
         if self.vid:
             return self.vid
+        if isinstance(self.qr_payload, str):
+            decoded = decode_qr_token(self.qr_payload)
+            return decoded[2] if decoded else None
         if self.qr_payload and "vid" in self.qr_payload:
             return self.qr_payload["vid"]
         return None
@@ -45,6 +60,21 @@ class VIDVerifyResponse(BaseModel):
     pan_verified: Optional[bool] = Field(None, description="PAN verification status")
 
 
+class VIDBatchVerifyRequest(BaseModel):
+    """Schema for bulk VID verification (gate scanners)."""
+    items: list[VIDVerifyRequest] = Field(
+        ...,
+        min_length=1,
+        max_length=settings.verify_batch_max_items,
+        description="VIDs or QR payloads to verify, in scan order"
+    )
+
+
+class VIDBatchVerifyResponse(BaseModel):
+    """Schema for bulk VID verification response."""
+    results: list[VIDVerifyResponse] = Field(..., description="One result per item, in request order")
+
+
 class VIDItem(BaseModel):
     """Schema for a single VID in list response."""
     vid: str = Field(..., description="Virtual ID")
@@ -61,5 +91,17 @@ class VIDItem(BaseModel):
 
 class VIDListResponse(BaseModel):
     """Schema for listing user's VIDs."""
-    vids: list[VIDItem] = Field(..., description="List of user's VIDs")
+    vids: list[VIDItem] = Field(..., description="One page of the user's VIDs, newest first")
     total: int = Field(..., description="Total number of VIDs")
+    count: int = Field(..., description="Number of VIDs in this page")
+    next_cursor: Optional[str] = Field(None, description="Cursor for the next page, null on the last page")
+
+
+class VIDStatsResponse(BaseModel):
+    """Schema for per-user VID counts by state."""
+    total: int = Field(..., description="All VIDs ever generated")
+    active: int = Field(..., description="Usable now")
+    expired: int = Field(..., description="Past expiry (not revoked)")
+    used: int = Field(..., description="Usage limit reached (not revoked or expired)")
+    revoked: int = Field(..., description="Revoked by the user")
+    verifications: int = Field(..., description="Successful verifications across all VIDs")
@@ -5,7 +5,12 @@ from security.crypto import (
     hash_identifier,
     sign_qr_data,
     verify_qr_signature,
-    generate_qr_payload
+    generate_qr_payload,
+    generate_qr_token,
+    decode_qr_token,
+    verify_qr_payload,
+    qr_verifier,
+    QRRejection
 )
 
 __all__ = [
@@ -13,5 +18,10 @@ __all__ = [
     "hash_identifier",
     "sign_qr_data",
     "verify_qr_signature",
-    "generate_qr_payload"
+    "generate_qr_payload",
+    "generate_qr_token",
+    "decode_qr_token",
+    "verify_qr_payload",
+    "qr_verifier",
+    "QRRejection"
 ]
@@ -4,17 +4,28 @@ Cryptographic utilities for VID generation and QR code signing.
 This module provides:
 - Secure VID generation
 - SHA-256 hashing for identifiers
-- HMAC-SHA256 signing for QR codes
-- Signature verification
+- HMAC-SHA256 signing for QR codes (JSON payload and compact token)
+- Signature and expiry verification
 """
 
 import secrets
 import hashlib
 import hmac
 import json
-from datetime import datetime
-from typing import Dict, Optional, Tuple
+import re
+import enum
+import base64
+import binascii
+import calendar
+import struct
+import time
+from datetime import datetime, timezone
+from typing import Dict, Optional, Tuple, Union
 from config import settings
+from monitoring.metrics import hmac_duration_seconds
+
+_HMAC_PAYLOAD_TIMER = hmac_duration_seconds.labels("payload")
+_HMAC_TOKEN_TIMER = hmac_duration_seconds.labels("token")
 
 
 def generate_vid() -> str:
@@ -47,6 +58,41 @@ def hash_identifier(identifier: str) -> str:
     return hashlib.sha256(identifier.encode()).hexdigest()
 
 
+_HMAC_BASES: Dict[int, "hmac.HMAC"] = {}
+
+
+def qr_signing_keys() -> Dict[int, str]:
+    """
+    All QR keys still accepted, by key ID.
+    
+    The current ``hmac_secret_key`` signs new codes under ``qr_key_id``;
+    ``qr_retired_keys`` keeps codes issued under earlier keys verifiable.
+    """
+    keys = dict(settings.qr_retired_keys)
+    keys[settings.qr_key_id] = settings.hmac_secret_key
+    return keys
+
+
+def _hmac_base(key_id: Optional[int] = None):
+    """HMAC-SHA256 state keyed with a QR secret, built once per key."""
+    if key_id is None:
+        key_id = settings.qr_key_id
+    
+    base = _HMAC_BASES.get(key_id)
+    if base is None:
+        secret = qr_signing_keys().get(key_id)
+        if secret is None:
+            return None
+        base = hmac.new(secret.encode(), digestmod=hashlib.sha256)
+        _HMAC_BASES[key_id] = base
+    return base
+
+
+def reset_key_cache():
+    """Forget cached key material (call after changing QR keys)."""
+    _HMAC_BASES.clear()
+
+
 def sign_qr_data(data: str) -> str:
     """
     Sign data using HMAC-SHA256.
@@ -59,11 +105,12 @@ def sign_qr_data(data: str) -> str:
     Returns:
         Hexadecimal HMAC signature
     """
-    signature = hmac.new(
-        settings.hmac_secret_key.encode(),
-        data.encode(),
-        hashlib.sha256
-    ).hexdigest()
+    started = time.perf_counter()
+    # Copy the pre-keyed HMAC state instead of re-deriving it from the secret
+    mac = _hmac_base().copy()
+    mac.update(data.encode())
+    signature = mac.hexdigest()
+    _HMAC_PAYLOAD_TIMER.observe(time.perf_counter() - started)
     
     return signature
 
@@ -121,36 +168,216 @@ def generate_qr_payload(vid: str, expires_at: datetime) -> Dict[str, str]:
     }
 
 
-def verify_qr_payload(payload: Dict[str, str]) -> Tuple[bool, Optional[str]]:
+# Compact QR token layout (big-endian), encoded as unpadded base64url:
+#   version (1) | key id (1) | VID (5) | expires_at epoch seconds (4) | truncated MAC (12)
+QR_TOKEN_VERSION = 1
+_TOKEN_HEADER = struct.Struct(">BB5sI")
+QR_TOKEN_MAC_BYTES = 12
+QR_TOKEN_BYTES = _TOKEN_HEADER.size + QR_TOKEN_MAC_BYTES
+
+
+def _token_mac(key_id: int, signed: bytes) -> Optional[bytes]:
+    started = time.perf_counter()
+    base = _hmac_base(key_id)
+    if base is None:
+        return None
+    mac = base.copy()
+    mac.update(signed)
+    digest = mac.digest()[:QR_TOKEN_MAC_BYTES]
+    _HMAC_TOKEN_TIMER.observe(time.perf_counter() - started)
+    return digest
+
+
+def generate_qr_token(vid: str, expires_at: datetime) -> str:
     """
-    Verify a QR code payload's signature.
+    Generate a compact, signed QR token.
+    
+    Much smaller than the JSON payload (31 characters), so QR codes are
+    less dense and faster to scan. Carries the signing key ID so the
+    secret can be rotated without invalidating outstanding codes.
     
     Args:
-        payload: Dictionary with vid, expires_at, and signature
+        vid: Virtual ID
+        expires_at: Expiry datetime (UTC, truncated to whole seconds)
         
     Returns:
-        Tuple of (is_valid, error_message)
-        - (True, None) if valid
-        - (False, error_message) if invalid
+        base64url token string
     """
-    # Check required fields
-    required_fields = ["vid", "expires_at", "signature"]
-    for field in required_fields:
-        if field not in payload:
-            return False, f"Missing required field: {field}"
+    expires_epoch = calendar.timegm(expires_at.utctimetuple())
+    signed = _TOKEN_HEADER.pack(
+        QR_TOKEN_VERSION,
+        settings.qr_key_id,
+        int(vid).to_bytes(5, "big"),
+        expires_epoch
+    )
+    token = signed + _token_mac(settings.qr_key_id, signed)
+    return base64.urlsafe_b64encode(token).rstrip(b"=").decode()
+
+
+def decode_qr_token(token: str) -> Optional[Tuple[int, int, str, int, bytes, bytes]]:
+    """
+    Unpack a QR token without verifying it.
     
-    # Extract signature
-    signature = payload["signature"]
+    Returns:
+        Tuple of (version, key_id, vid, expires_epoch, signed_bytes, mac),
+        or None if the token is not well-formed
+    """
+    if not isinstance(token, str) or len(token) > 64:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+    except (ValueError, binascii.Error):
+        return None
+    if len(raw) != QR_TOKEN_BYTES:
+        return None
     
-    # Reconstruct data without signature
-    data = {
-        "vid": payload["vid"],
-        "expires_at": payload["expires_at"]
-    }
-    data_str = json.dumps(data, sort_keys=True)
+    signed, mac = raw[:_TOKEN_HEADER.size], raw[_TOKEN_HEADER.size:]
+    version, key_id, vid_bytes, expires_epoch = _TOKEN_HEADER.unpack(signed)
+    vid_number = int.from_bytes(vid_bytes, "big")
+    if not 100000000000 <= vid_number <= 999999999999:
+        return None
     
-    # Verify signature
-    if not verify_qr_signature(data_str, signature):
-        return False, "Invalid signature - QR code may be tampered"
+    return version, key_id, str(vid_number), expires_epoch, signed, mac
+
+
+class QRRejection(str, enum.Enum):
+    """Reasons a QR payload is rejected before any database lookup."""
+    MISSING_FIELD = "missing_field"
+    MALFORMED = "malformed"
+    UNKNOWN_KEY = "unknown_key"
+    BAD_SIGNATURE = "bad_signature"
+    EXPIRED = "expired"
+
+
+class QRVerifier:
+    """
+    Stateless QR payload checks with rejection counters.
+    
+    Accepts both the JSON dict payload and the compact token string. For
+    the dict form it validates field formats and rebuilds the canonical
+    signed string without a JSON round trip. Either way it checks the
+    HMAC against cached key material, then enforces the signed expiry.
+    """
     
-    return True, None
+    def __init__(self):
+        self.accepted = 0
+        self.rejected = {reason: 0 for reason in QRRejection}
+    
+    def check(
+        self,
+        payload: Union[Dict[str, str], str],
+        now: Optional[datetime] = None
+    ) -> Tuple[Optional[QRRejection], Optional[str]]:
+        """
+        Check a QR payload.
+        
+        Args:
+            payload: Dictionary with vid, expires_at, and signature, or a
+                compact QR token
+            now: Current UTC time (defaults to datetime.utcnow())
+            
+        Returns:
+            Tuple of (rejection_reason, error_message)
+            - (None, None) if valid
+            - (reason, error_message) if invalid
+        """
+        if isinstance(payload, str):
+            reason, error = self._check_token(payload, now)
+        else:
+            reason, error = self._check(payload, now)
+        if reason is None:
+            self.accepted += 1
+        else:
+            self.rejected[reason] += 1
+        return reason, error
+    
+    def _check(self, payload, now):
+        # Check required fields
+        for field in QR_REQUIRED_FIELDS:
+            if field not in payload:
+                return QRRejection.MISSING_FIELD, f"Missing required field: {field}"
+        
+        vid = payload["vid"]
+        expires_at_str = payload["expires_at"]
+        signature = payload["signature"]
+        
+        # Strict formats also guarantee nothing in the canonical string needs escaping
+        if not (isinstance(vid, str) and len(vid) == 12 and vid.isdigit()):
+            return QRRejection.MALFORMED, "Malformed VID"
+        if not isinstance(signature, str) or len(signature) != 64:
+            return QRRejection.MALFORMED, "Malformed signature"
+        try:
+            expires_at = datetime.fromisoformat(expires_at_str)
+        except (TypeError, ValueError):
+            return QRRejection.MALFORMED, "Malformed expiry timestamp"
+        if not _ISO_SAFE.fullmatch(expires_at_str):
+            return QRRejection.MALFORMED, "Malformed expiry timestamp"
+        
+        # Same string json.dumps(data, sort_keys=True) produces at signing time
+        data_str = f'{{"expires_at": "{expires_at_str}", "vid": "{vid}"}}'
+        
+        # Verify signature
+        if not verify_qr_signature(data_str, signature):
+            return QRRejection.BAD_SIGNATURE, "Invalid signature - QR code may be tampered"
+        
+        # Enforce the signed expiry
+        if expires_at.tzinfo is not None:
+            expires_at = expires_at.astimezone(timezone.utc).replace(tzinfo=None)
+        if (now or datetime.utcnow()) >= expires_at:
+            return QRRejection.EXPIRED, "QR code has expired"
+        
+        return None, None
+    
+    def _check_token(self, token, now):
+        decoded = decode_qr_token(token)
+        if decoded is None:
+            return QRRejection.MALFORMED, "Malformed QR token"
+        
+        version, key_id, vid, expires_epoch, signed, mac = decoded
+        if version != QR_TOKEN_VERSION:
+            return QRRejection.MALFORMED, f"Unsupported QR token version: {version}"
+        
+        expected = _token_mac(key_id, signed)
+        if expected is None:
+            return QRRejection.UNKNOWN_KEY, "QR code signed with an unknown key"
+        if not hmac.compare_digest(expected, mac):
+            return QRRejection.BAD_SIGNATURE, "Invalid signature - QR code may be tampered"
+        
+        now_epoch = calendar.timegm((now or datetime.utcnow()).utctimetuple())
+        if now_epoch >= expires_epoch:
+            return QRRejection.EXPIRED, "QR code has expired"
+        
+        return None, None
+    
+    def stats(self) -> dict:
+        """Snapshot of accepted/rejected counters."""
+        return {
+            "accepted": self.accepted,
+            "rejected": {reason.value: count for reason, count in self.rejected.items()}
+        }
+
+
+QR_REQUIRED_FIELDS = ("vid", "expires_at", "signature")
+
+# Characters isoformat() can emit
+_ISO_SAFE = re.compile(r"[0-9T:.+\-]+")
+
+# Global QR verifier instance
+qr_verifier = QRVerifier()
+
+
+def verify_qr_payload(payload: Union[Dict[str, str], str]) -> Tuple[bool, Optional[str]]:
+    """
+    Verify a QR code payload's signature and signed expiry.
+    
+    Args:
+        payload: Dictionary with vid, expires_at, and signature, or a
+            compact QR token
+        
+    Returns:
+        Tuple of (is_valid, error_message)
+        - (True, None) if valid
+        - (False, error_message) if invalid
+    """
+    reason, error = qr_verifier.check(payload)
+    return reason is None, error
@@ -0,0 +1,347 @@
+"""
+Sliding-window rate limiting for the configured limits.
+
+Implements the ``rate_limit_*`` settings (e.g. "10/minute") with the
+sliding-window counter approximation: each key keeps only the counts of
+the current and previous fixed windows, and the previous count is
+weighted by how much of it still overlaps the sliding window. That makes
+every check O(1) in time and memory per key.
+
+Counter state lives in a pluggable backend:
+- ``memory``: sharded LRU dictionaries, bounded by ``rate_limit_max_keys``
+- ``sqlite``: a small SQLite file shared by every worker on the host
+"""
+
+import asyncio
+import math
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Iterable, Optional, Tuple
+
+from fastapi import HTTPException, Request, Response, status
+
+from config import settings
+from security.crypto import hash_identifier
+
+
+UNIT_SECONDS = {
+    "second": 1,
+    "minute": 60,
+    "hour": 3600,
+    "day": 86400,
+}
+
+
+def parse_rate(rate: str) -> Tuple[int, int]:
+    """
+    Parse a rate string such as "10/minute" or "100/5 minutes".
+
+    Returns:
+        Tuple of (limit, window_seconds)
+    """
+    try:
+        count, period = rate.split("/", 1)
+        parts = period.strip().split()
+        multiplier = int(parts[0]) if len(parts) == 2 else 1
+        unit = parts[-1].lower().rstrip("s")
+        return int(count), multiplier * UNIT_SECONDS[unit]
+    except (ValueError, KeyError, IndexError):
+        raise ValueError(f"Invalid rate limit: {rate!r}")
+
+
+@dataclass
+class RateLimitDecision:
+    """Outcome of a rate limit check."""
+    allowed: bool
+    limit: int
+    remaining: int
+    reset_after: int  # Seconds until the current window ends
+    retry_after: int  # Seconds until the request would be allowed (0 if allowed)
+
+
+def slide(
+    state: Optional[Tuple[int, int, int]],
+    limit: int,
+    window: int,
+    cost: int,
+    now: float
+) -> Tuple[RateLimitDecision, Tuple[int, int, int]]:
+    """
+    Apply one request to a key's sliding-window state.
+
+    Args:
+        state: (window_index, current_count, previous_count), or None for a new key
+        limit: Requests allowed per window
+        window: Window length in seconds
+        cost: Units this request consumes
+        now: Current time (epoch seconds)
+
+    Returns:
+        Tuple of (decision, new_state)
+    """
+    index = int(now // window)
+    elapsed = now - index * window
+
+    current, previous = 0, 0
+    if state is not None:
+        last_index, last_current, last_previous = state
+        if last_index == index:
+            current, previous = last_current, last_previous
+        elif last_index == index - 1:
+            previous = last_current
+
+    weight = 1 - elapsed / window
+    estimated = previous * weight + current
+    reset_after = max(1, math.ceil(window - elapsed))
+
+    if estimated + cost <= limit:
+        current += cost
+        remaining = max(0, int(limit - (estimated + cost)))
+        return RateLimitDecision(True, limit, remaining, reset_after, 0), (index, current, previous)
+
+    # Time until enough of the previous window has slid out
+    if current + cost > limit or previous == 0:
+        retry_after = reset_after
+    else:
+        needed = window * (1 - (limit - current - cost) / previous)
+        retry_after = max(1, math.ceil(needed - elapsed))
+
+    return RateLimitDecision(False, limit, 0, reset_after, retry_after), (index, current, previous)
+
+
+class MemoryBackend:
+    """
+    In-process counters in sharded LRU dictionaries.
+
+    Sharding keeps each eviction scan short; when a shard is full its
+    least recently used key is dropped (which only ever forgives a client).
+    """
+
+    def __init__(self, max_keys: int, shards: int = 16):
+        self.shards = max(1, shards)
+        self.max_keys_per_shard = max(1, max_keys // self.shards)
+        self._shards = [OrderedDict() for _ in range(self.shards)]
+        self.evictions = 0
+
+    async def hit(self, key: str, limit: int, window: int, cost: int, now: float) -> RateLimitDecision:
+        shard = self._shards[hash(key) % self.shards]
+        decision, state = slide(shard.get(key), limit, window, cost, now)
+
+        shard[key] = state
+        shard.move_to_end(key)
+        if len(shard) > self.max_keys_per_shard:
+            shard.popitem(last=False)
+            self.evictions += 1
+
+        return decision
+
+    def size(self) -> int:
+        return sum(len(shard) for shard in self._shards)
+
+    def close(self):
+        pass
+
+
+class SQLiteBackend:
+    """
+    Counters in a SQLite file, shared by every worker process on the host.
+
+    Each check is one short IMMEDIATE transaction run in a thread so the
+    event loop never waits on the file lock. Stale keys are purged
+    periodically. ``size`` is an approximate key count kept in memory:
+    it counts keys this worker creates and is recounted at each purge.
+    """
+
+    PURGE_EVERY = 1000
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=5, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS rate_limits ("
+            " key TEXT PRIMARY KEY,"
+            " window_index INTEGER NOT NULL,"
+            " current INTEGER NOT NULL,"
+            " previous INTEGER NOT NULL,"
+            " expires_at REAL NOT NULL)"
+        )
+        self._hits = 0
+        self._keys = self._conn.execute("SELECT COUNT(*) FROM rate_limits").fetchone()[0]
+        self.evictions = 0
+
+    def _hit(self, key: str, limit: int, window: int, cost: int, now: float) -> RateLimitDecision:
+        with self._lock:
+            conn = self._conn
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT window_index, current, previous FROM rate_limits WHERE key = ?",
+                    (key,)
+                ).fetchone()
+                decision, (index, current, previous) = slide(row, limit, window, cost, now)
+                conn.execute(
+                    "INSERT INTO rate_limits (key, window_index, current, previous, expires_at)"
+                    " VALUES (?, ?, ?, ?, ?)"
+                    " ON CONFLICT(key) DO UPDATE SET window_index = excluded.window_index,"
+                    " current = excluded.current, previous = excluded.previous,"
+                    " expires_at = excluded.expires_at",
+                    (key, index, current, previous, (index + 2) * window)
+                )
+                if row is None:
+                    self._keys += 1
+
+                self._hits += 1
+                if self._hits % self.PURGE_EVERY == 0:
+                    purged = conn.execute("DELETE FROM rate_limits WHERE expires_at < ?", (now,))
+                    self.evictions += purged.rowcount
+                    self._keys = conn.execute("SELECT COUNT(*) FROM rate_limits").fetchone()[0]
+
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+        return decision
+
+    async def hit(self, key: str, limit: int, window: int, cost: int, now: float) -> RateLimitDecision:
+        return await asyncio.to_thread(self._hit, key, limit, window, cost, now)
+
+    def size(self) -> int:
+        # Never touches the connection, so stats cannot block on the file lock
+        return self._keys
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class RateLimiter:
+    """
+    Enforces named limits ("verification", "generation", ...) per key.
+    """
+
+    def __init__(self, limits: Dict[str, str], backend, enabled: bool = True):
+        self.enabled = enabled
+        self.limits = {name: parse_rate(rate) for name, rate in limits.items()}
+        self.backend = backend
+
+        # Counters
+        self.allowed = 0
+        self.limited = 0
+
+    async def check(self, name: str, keys: Iterable[str], cost: int = 1) -> Optional[RateLimitDecision]:
+        """
+        Count a request against every key under the named limit.
+
+        Returns:
+            The most restrictive decision, or None when limiting is disabled
+        """
+        if not self.enabled:
+            return None
+
+        limit, window = self.limits[name]
+        now = time.time()
+
+        strictest = None
+        for key in keys:
+            decision = await self.backend.hit(f"{name}:{key}", limit, window, cost, now)
+            if strictest is None or (not decision.allowed, -decision.remaining) > (not strictest.allowed, -strictest.remaining):
+                strictest = decision
+
+        if strictest is not None:
+            if strictest.allowed:
+                self.allowed += 1
+            else:
+                self.limited += 1
+        return strictest
+
+    async def enforce(self, name: str, keys: Iterable[str], response: Response, cost: int = 1):
+        """
+        Check a limit and set RateLimit-* headers on the response.
+
+        Raises:
+            HTTPException: 429 with Retry-After when the limit is exceeded
+        """
+        decision = await self.check(name, keys, cost)
+        if decision is None:
+            return
+
+        headers = rate_limit_headers(decision)
+        if not decision.allowed:
+            headers["Retry-After"] = str(decision.retry_after)
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Rate limit exceeded, please retry later",
+                headers=headers
+            )
+
+        response.headers.update(headers)
+
+    def stats(self) -> dict:
+        """Snapshot of allow/limit counters and backend size."""
+        return {
+            "enabled": self.enabled,
+            "backend": type(self.backend).__name__,
+            "keys": self.backend.size(),
+            "evictions": self.backend.evictions,
+            "allowed": self.allowed,
+            "limited": self.limited
+        }
+
+    def close(self):
+        self.backend.close()
+
+
+def rate_limit_headers(decision: RateLimitDecision) -> Dict[str, str]:
+    """Standard RateLimit-* response headers for a decision."""
+    return {
+        "RateLimit-Limit": str(decision.limit),
+        "RateLimit-Remaining": str(decision.remaining),
+        "RateLimit-Reset": str(decision.reset_after)
+    }
+
+
+def client_key(request: Request) -> str:
+    """
+    Rate limit key for the client's IP address (hashed, never stored raw).
+
+    Behind a reverse proxy this is only the real client when uvicorn
+    trusts the proxy's X-Forwarded-For (``forwarded_allow_ips``).
+    """
+    host = request.client.host if request.client else "unknown"
+    return "ip:" + hash_identifier(host)[:32]
+
+
+def _create_backend():
+    if settings.rate_limit_backend == "sqlite":
+        return SQLiteBackend(settings.rate_limit_sqlite_path)
+    return MemoryBackend(settings.rate_limit_max_keys, settings.rate_limit_shards)
+
+
+# Global rate limiter instance
+rate_limiter = RateLimiter(
+    limits={
+        "auth": settings.rate_limit_auth,
+        "verification": settings.rate_limit_verification,
+        "generation": settings.rate_limit_generation,
+    },
+    backend=_create_backend(),
+    enabled=settings.rate_limit_enabled
+)
+
+
+async def limit_auth(request: Request, response: Response):
+    """Dependency: per-IP limit on login/registration (bcrypt is expensive)."""
+    await rate_limiter.enforce("auth", [client_key(request)], response)
+
+
+async def limit_verification(request: Request, response: Response):
+    """Dependency: per-IP limit on the public /verify-vid endpoint."""
+    await rate_limiter.enforce("verification", [client_key(request)], response)
+
@@ -0,0 +1,376 @@
+"""
+In-memory counting Bloom filter of known VIDs.
+
+The public /verify-vid endpoint is what scanners hammer with random
+12-digit numbers. A definite miss in this filter means the VID has never
+been issued (or its row has been deleted), so the request can be answered
+without touching the database. Counters instead of bits allow VIDs to be
+removed when their rows are deleted.
+
+With several workers each has its own filter, so a VID issued by another
+worker is missing from it. In that mode a definite miss is re-checked
+after pulling recently issued VIDs from the database (``check_many``).
+That catch-up re-reads every VID issued in the last ``sync_overlap``, so
+it runs at most once per ``sync_interval`` and is shared by all misses
+in a batch; misses in between fall through to the primary key lookup. A
+random VID therefore costs one database query with several workers,
+against none with one.
+
+Catch-up reads by ``created_at`` from a watermark (the newest issue time
+seen) minus ``sync_overlap``. A VID committed later than its
+``created_at`` still falls inside the overlap, as long as it commits
+within ``sync_overlap`` of being stamped; ``issue_vids`` redraws VIDs
+whose insert ran too long (``too_late``) rather than commit them.
+
+Only the worker running the reaper removes deleted VIDs from its filter.
+The others' filters would only ever grow, with their false-positive rate
+climbing until restart, so with several workers each rebuilds its
+filter from the table every ``rebuild_interval`` (``start``). Between
+rebuilds those filters still over-count reaped VIDs.
+"""
+
+import asyncio
+import hashlib
+import logging
+import math
+import secrets
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import select
+
+from config import settings
+from database import engine
+from models.virtual_id import VirtualID
+
+
+logger = logging.getLogger(__name__)
+
+
+class VIDFilter:
+    """
+    Counting Bloom filter sized for a target capacity and false-positive rate.
+
+    Uses 8-bit saturating counters; a saturated counter is never
+    decremented, which can only cause extra false positives, never misses.
+    Until ``load`` has run the filter answers "maybe" for everything.
+    """
+
+    def __init__(
+        self,
+        capacity: int,
+        error_rate: float,
+        enabled: bool = True,
+        shared: bool = False,
+        sync_overlap_seconds: float = 60,
+        sync_interval_seconds: float = 1,
+        rebuild_interval_seconds: float = 3600
+    ):
+        self.enabled = enabled
+        self.capacity = max(1, capacity)
+        self.error_rate = error_rate
+        self.shared = shared
+        # Catch-up re-reads this far behind the newest issue time seen, for
+        # transactions that committed out of order
+        self.sync_overlap = timedelta(seconds=sync_overlap_seconds)
+        self.sync_interval = sync_interval_seconds
+        self.rebuild_interval = rebuild_interval_seconds
+
+        # Standard Bloom sizing: m = -n ln p / (ln 2)^2, k = (m / n) ln 2
+        self.size = max(8, int(math.ceil(-self.capacity * math.log(error_rate) / (math.log(2) ** 2))))
+        self.hash_count = max(1, int(round(self.size / self.capacity * math.log(2))))
+
+        self._counters = bytearray(self.size) if enabled else bytearray()
+        # Keyed hashing so outsiders cannot search for colliding VIDs
+        self._key = secrets.token_bytes(16)
+        self.ready = False
+        self.count = 0
+
+        # Multi-worker catch-up state: newest issue time seen, and the VIDs
+        # inside the overlap window so they are not counted twice
+        self._watermark: Optional[datetime] = None
+        self._recent: Dict[str, datetime] = {}
+        self._last_sync_started = float("-inf")
+        self._sync_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+        # Counters
+        self.checks = 0
+        self.definite_misses = 0
+        self.false_positives = 0
+        self.syncs = 0
+        self.synced = 0
+        self.deferred = 0
+        self.rebuilds = 0
+        self.failed_rebuilds = 0
+
+    def _positions(self, vid: str):
+        digest = hashlib.blake2b(vid.encode(), key=self._key, digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hash_count)]
+
+    def _bump(self, counters: bytearray, vid: str):
+        for pos in self._positions(vid):
+            if counters[pos] < 255:
+                counters[pos] += 1
+
+    def add(self, vid: str, created_at: Optional[datetime] = None):
+        """
+        Record a VID as existing.
+
+        Args:
+            vid: The VID
+            created_at: Its issue time; lets multi-worker catch-up skip it
+        """
+        if not self.enabled:
+            return
+
+        if self.shared and created_at is not None:
+            self._recent[vid] = created_at
+
+        self._bump(self._counters, vid)
+        self.count += 1
+
+    def remove(self, vid: str):
+        """Forget a VID whose row has been deleted."""
+        if not self.enabled:
+            return
+
+        counters = self._counters
+        positions = self._positions(vid)
+        # Only remove something that could be present, or counts go wrong
+        if any(counters[pos] == 0 for pos in positions):
+            return
+
+        for pos in positions:
+            if counters[pos] < 255:
+                counters[pos] -= 1
+        self.count = max(0, self.count - 1)
+
+    def might_contain(self, vid: str) -> bool:
+        """
+        Check whether a VID may exist.
+
+        Returns:
+            False only if the VID definitely does not exist
+        """
+        if not self.enabled or not self.ready:
+            return True
+
+        self.checks += 1
+        counters = self._counters
+        for pos in self._positions(vid):
+            if counters[pos] == 0:
+                self.definite_misses += 1
+                return False
+        return True
+
+    async def check(self, vid: str) -> bool:
+        """``check_many`` for a single VID."""
+        return (await self.check_many([vid]))[0]
+
+    async def check_many(self, vids: List[str]) -> List[bool]:
+        """
+        ``might_contain`` for each VID, but with several workers a definite
+        miss is only trusted after catching up on VIDs issued by the others.
+
+        All misses share one catch-up, started after this call was, so a
+        VID committed by another worker before the request arrived is
+        always found. If a catch-up is running or ran within
+        ``sync_interval``, the misses are answered "maybe" instead and
+        left to the database lookup.
+        """
+        found = [self.might_contain(vid) for vid in vids]
+        misses = [index for index, hit in enumerate(found) if not hit]
+        if not misses or not self.shared:
+            return found
+
+        # Count the re-check or deferral, not both lookups
+        self.definite_misses -= len(misses)
+
+        if not await self.sync(throttle=True):
+            self.deferred += len(misses)
+            for index in misses:
+                found[index] = True
+            return found
+
+        self.checks -= len(misses)
+        for index in misses:
+            found[index] = self.might_contain(vids[index])
+        return found
+
+    async def sync(self, throttle: bool = False) -> bool:
+        """
+        Add VIDs other workers issued since the last load or sync.
+
+        Served by the ``created_at`` index, but re-reads every VID issued
+        in the last ``sync_overlap``.
+
+        Args:
+            throttle: Skip the query if a catch-up is running or started
+                less than ``sync_interval`` ago
+
+        Returns:
+            Whether the catch-up ran
+        """
+        if throttle and (
+            self._sync_lock.locked()
+            or time.monotonic() - self._last_sync_started < self.sync_interval
+        ):
+            return False
+
+        async with self._sync_lock:
+            self._last_sync_started = time.monotonic()
+
+            query = select(VirtualID.vid, VirtualID.created_at)
+            if self._watermark is not None:
+                query = query.where(VirtualID.created_at > self._watermark - self.sync_overlap)
+
+            async with engine.connect() as conn:
+                rows = (await conn.execute(query)).all()
+
+            for vid, created_at in rows:
+                if vid not in self._recent:
+                    self.add(vid, created_at)
+                    self.synced += 1
+                self._advance(created_at)
+            self._prune_recent()
+
+            self.syncs += 1
+        return True
+
+    def too_late(self, created_at: datetime) -> bool:
+        """
+        Whether VIDs stamped ``created_at`` and not yet committed must not
+        be committed, because other workers' catch-up may no longer reach
+        them. Leaves half the overlap for the commit itself.
+        """
+        return self.shared and datetime.utcnow() - created_at > self.sync_overlap / 2
+
+    def _advance(self, created_at: datetime):
+        if self._watermark is None or created_at > self._watermark:
+            self._watermark = created_at
+
+    def _prune_recent(self):
+        # Entries behind the next catch-up window can never be returned again
+        if self._watermark is not None:
+            horizon = self._watermark - self.sync_overlap
+            self._recent = {vid: created for vid, created in self._recent.items() if created > horizon}
+
+    def record_false_positive(self):
+        """Note that a VID passed (or was deferred by) the filter but was not in the database."""
+        self.false_positives += 1
+
+    async def load(self):
+        """
+        Rebuild the filter from every row in ``virtual_ids`` and mark it ready.
+
+        Streams VIDs in chunks into fresh counters, so memory stays flat
+        for large tables and the current counters keep answering until
+        they are swapped out. Run at startup, before requests are served,
+        and periodically with several workers (``start``). Catch-ups wait
+        (or are deferred) while it runs.
+        """
+        if not self.enabled:
+            return
+
+        async with self._sync_lock:
+            counters = bytearray(self.size)
+            count = 0
+            watermark = self._watermark
+            # add() may put VIDs this recent into the current counters after
+            # the snapshot below was taken; older ones committed before it
+            cutoff = datetime.utcnow() - 2 * self.sync_overlap
+            recent: Dict[str, datetime] = {}
+
+            async with engine.connect() as conn:
+                result = await conn.stream(select(VirtualID.vid, VirtualID.created_at))
+                async for chunk in result.partitions(10000):
+                    for vid, created_at in chunk:
+                        self._bump(counters, vid)
+                        count += 1
+                        if created_at > cutoff:
+                            recent[vid] = created_at
+                        if watermark is None or created_at > watermark:
+                            watermark = created_at
+
+            # Carry over VIDs added while streaming that the snapshot missed
+            for vid, created_at in self._recent.items():
+                if created_at > cutoff and vid not in recent:
+                    self._bump(counters, vid)
+                    count += 1
+                    recent[vid] = created_at
+
+            self._counters = counters
+            self.count = count
+            self._recent = recent
+            self._watermark = watermark
+            self._prune_recent()
+            self.ready = True
+
+    def start(self):
+        """With several workers, start rebuilding the filter every ``rebuild_interval``."""
+        if self.enabled and self.shared and self.rebuild_interval > 0 and self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        """Cancel the rebuild task."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _loop(self):
+        while True:
+            await asyncio.sleep(self.rebuild_interval)
+            try:
+                await self.load()
+                self.rebuilds += 1
+            except Exception:
+                self.failed_rebuilds += 1
+                logger.exception("VID filter rebuild failed")
+
+    def estimated_error_rate(self) -> float:
+        """False-positive rate expected at the current fill level."""
+        if self.count == 0:
+            return 0.0
+        return (1 - math.exp(-self.hash_count * self.count / self.size)) ** self.hash_count
+
+    def stats(self) -> dict:
+        """Snapshot of sizing and hit/miss counters."""
+        return {
+            "enabled": self.enabled,
+            "ready": self.ready,
+            "count": self.count,
+            "capacity": self.capacity,
+            "target_error_rate": self.error_rate,
+            "estimated_error_rate": round(self.estimated_error_rate(), 6),
+            "size_bytes": len(self._counters),
+            "hash_count": self.hash_count,
+            "checks": self.checks,
+            "definite_misses": self.definite_misses,
+            "false_positives": self.false_positives,
+            "shared": self.shared,
+            "syncs": self.syncs,
+            "synced": self.synced,
+            "deferred": self.deferred,
+            "rebuilds": self.rebuilds,
+            "failed_rebuilds": self.failed_rebuilds
+        }
+
+
+# Global VID filter instance
+vid_filter = VIDFilter(
+    capacity=settings.vid_filter_capacity,
+    error_rate=settings.vid_filter_error_rate,
+    enabled=settings.vid_filter_enabled,
+    shared=settings.workers > 1,
+    sync_overlap_seconds=settings.vid_filter_sync_overlap_seconds,
+    sync_interval_seconds=settings.vid_filter_sync_interval_seconds,
+    rebuild_interval_seconds=settings.vid_filter_rebuild_interval_seconds
+)
@@ -0,0 +1,70 @@
+"""
+Per-user cache of /vid/stats results.
+
+Kept out of the routes so the reaper and the verification routes can
+invalidate entries without importing the VID management router.
+"""
+
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from config import settings
+from schemas.virtual_id import VIDStatsResponse
+
+
+class VIDStatsCache:
+    """
+    Per-user cache of /vid/stats results.
+    
+    Entries are dropped on generate, revoke and consume, and never outlive
+    the user's next VID expiry (when an active VID turns expired).
+    """
+    
+    def __init__(self, ttl_seconds: int, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, VIDStatsResponse]]" = OrderedDict()
+        
+        # Counters
+        self.hits = 0
+        self.misses = 0
+    
+    def get(self, user_id: str) -> Optional[VIDStatsResponse]:
+        entry = self._entries.get(user_id)
+        if entry is None or entry[0] <= time.monotonic():
+            self._entries.pop(user_id, None)
+            self.misses += 1
+            return None
+        
+        self._entries.move_to_end(user_id)
+        self.hits += 1
+        return entry[1]
+    
+    def put(self, user_id: str, stats: VIDStatsResponse, valid_for: float):
+        ttl = min(self.ttl_seconds, valid_for)
+        if ttl <= 0 or self.max_entries <= 0:
+            return
+        
+        self._entries[user_id] = (time.monotonic() + ttl, stats)
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+    
+    def invalidate(self, user_id: Optional[str]):
+        if user_id is not None:
+            self._entries.pop(user_id, None)
+    
+    def stats(self) -> dict:
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses
+        }
+
+
+# Global VID stats cache instance
+vid_stats_cache = VIDStatsCache(
+    ttl_seconds=settings.vid_stats_cache_ttl_seconds,
+    max_entries=settings.vid_stats_cache_max_entries
+)
@@ -0,0 +1,169 @@
+"""
+Multi-process serving mode.
+
+``python main.py`` runs uvicorn with ``settings.workers`` worker
+processes. Uvicorn spawns each worker as a fresh interpreter that imports
+the app itself, so engines and their pools, the principal and stats
+caches, the VID filter, the bcrypt pool and the metrics registry all
+belong to one worker and nothing is inherited across a fork.
+
+Shared between workers:
+- Secret keys: from the environment or ``secrets_file``, loaded before
+  the workers start. Workers refuse to start with per-process random
+  keys, since each would reject the others' JWTs and QR signatures.
+- The database, and rate limits when ``rate_limit_backend`` is "sqlite"
+  (the "memory" backend counts per worker, so limits scale with workers).
+  Behind a reverse proxy, set ``forwarded_allow_ips`` so limits are keyed
+  on the real client IP rather than the proxy's.
+- Background maintenance (VID reaper, audit partition upkeep and
+  archiving) runs in the one worker holding ``maintenance_lock_path``;
+  another worker takes over if that one exits.
+
+Per worker, by design:
+- The VID filter catches up on VIDs issued by other workers before it
+  answers a definite miss, re-reading the last
+  ``vid_filter_sync_overlap_seconds`` of VIDs at most once per
+  ``vid_filter_sync_interval_seconds``; misses in between go to the
+  database. So unknown VIDs cost one primary key lookup each, where a
+  single worker answers them from memory (see ``VIDFilter.check_many``).
+  Only the maintenance worker removes reaped VIDs from its filter; the
+  others rebuild theirs every ``vid_filter_rebuild_interval_seconds``
+  and over-count reaped VIDs in between.
+- The principal cache only holds fully verified users, whose flags can
+  no longer change under it from another worker.
+- ``/vid/stats`` results may lag other workers' writes by up to
+  ``vid_stats_cache_ttl_seconds``; ``/metrics`` and ``/admin/stats`` describe
+  the worker that answered.
+"""
+
+import asyncio
+import logging
+import os
+import sys
+
+from config import settings
+
+try:
+    import fcntl
+except ImportError:  # Windows: no flock, single worker only
+    fcntl = None
+
+
+logger = logging.getLogger(__name__)
+
+
+def check_key_material():
+    """
+    Refuse to run several workers with per-process random keys.
+
+    Raises:
+        RuntimeError: If ``workers > 1`` and a secret key is ephemeral
+    """
+    if settings.workers > 1 and settings.ephemeral_keys:
+        raise RuntimeError(
+            f"WORKERS={settings.workers} needs shared secret keys, but "
+            f"{', '.join(settings.ephemeral_keys)} would be random per worker. "
+            "Set JWT_SECRET_KEY and HMAC_SECRET_KEY, or SECRETS_FILE."
+        )
+
+
+class MaintenanceLock:
+    """
+    Non-blocking ``flock`` electing one worker to run background maintenance.
+
+    Disabled (always held) with a single worker or where flock is missing.
+    Once acquired the lock is kept until the process exits; workers that
+    lost retry on each maintenance tick, so one takes over when the
+    holder dies.
+    """
+
+    def __init__(self, path: str, enabled: bool):
+        self.path = path
+        self.enabled = enabled and fcntl is not None
+        self._file = None
+
+        # Counters
+        self.contended = 0
+
+    def held(self) -> bool:
+        """Whether this process runs maintenance (acquiring the lock if free)."""
+        if not self.enabled or self._file is not None:
+            return True
+
+        lock_file = open(self.path, "a")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            self.contended += 1
+            return False
+
+        self._file = lock_file
+        logger.info("Worker %d runs background maintenance", os.getpid())
+        return True
+
+    def release(self):
+        """Give up the lock (at shutdown)."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def stats(self) -> dict:
+        """Snapshot of the election state."""
+        return {
+            "enabled": self.enabled,
+            "held": not self.enabled or self._file is not None,
+            "contended": self.contended
+        }
+
+
+# Global maintenance lock instance
+maintenance_lock = MaintenanceLock(
+    path=settings.maintenance_lock_path,
+    enabled=settings.workers > 1
+)
+
+
+async def _prepare_schema():
+    import models  # noqa: F401 (registers the tables)
+    from database import engine, init_db
+
+    await init_db()
+    await engine.dispose()
+
+
+def serve():
+    """
+    Run the app under uvicorn with ``settings.workers`` workers.
+
+    Checks run here, in the parent, before any worker starts. Workers
+    read the same settings (WORKERS included) from the environment.
+    """
+    import uvicorn
+
+    workers = settings.workers
+    try:
+        check_key_material()
+    except RuntimeError as exc:
+        sys.exit(str(exc))
+
+    if workers > 1 and settings.reload:
+        sys.exit("RELOAD only works with a single worker")
+    if workers > 1 and settings.rate_limit_enabled and settings.rate_limit_backend == "memory":
+        print(f"⚠️  rate_limit_backend=memory counts per worker: limits are effectively "
+              f"{workers}x; set RATE_LIMIT_BACKEND=sqlite to share them")
+
+    if workers > 1:
+        # Workers starting together would race on CREATE TABLE, so the
+        # schema is created once here first
+        asyncio.run(_prepare_schema())
+
+    uvicorn.run(
+        "main:app",
+        host=settings.host,
+        port=settings.port,
+        workers=workers if workers > 1 else None,
+        reload=settings.reload,
+        proxy_headers=True,
+        forwarded_allow_ips=settings.forwarded_allow_ips
+    )
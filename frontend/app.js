@@ -6,8 +6,11 @@
 const API_BASE_URL = 'https://htp-cemi.onrender.com';
 /**
  * Make an API request
+ *
+ * Authenticated requests rejected with 401 are retried once after
+ * renewing the short-lived access token with the refresh token.
  */
-async function apiRequest(endpoint, method = 'GET', body = null, requiresAuth = false) {
+async function apiRequest(endpoint, method = 'GET', body = null, requiresAuth = false, retried = false) {
     const headers = {
         'Content-Type': 'application/json'
     };
@@ -31,6 +34,9 @@ async function apiRequest(endpoint, method = 'GET', body = null, requiresAuth =
     
     try {
         const response = await fetch(`${API_BASE_URL}${endpoint}`, config);
+        if (response.status === 401 && requiresAuth && !retried && await refreshSession()) {
+            return apiRequest(endpoint, method, body, requiresAuth, true);
+        }
         const data = await response.json();
         
         if (!response.ok) {
@@ -43,6 +49,42 @@ async function apiRequest(endpoint, method = 'GET', body = null, requiresAuth =
     }
 }
 
+/**
+ * Store the tokens and user from a login, register or refresh response
+ */
+function saveSession(response) {
+    localStorage.setItem('token', response.access_token);
+    localStorage.setItem('refreshToken', response.refresh_token);
+    localStorage.setItem('user', JSON.stringify(response.user));
+}
+
+/**
+ * Get a new access token (with current verification status)
+ *
+ * Returns false if there is no refresh token or it was rejected.
+ */
+async function refreshSession() {
+    const refreshToken = localStorage.getItem('refreshToken');
+    if (!refreshToken) {
+        return false;
+    }
+
+    try {
+        const response = await fetch(`${API_BASE_URL}/auth/refresh`, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ refresh_token: refreshToken })
+        });
+        if (!response.ok) {
+            return false;
+        }
+        saveSession(await response.json());
+        return true;
+    } catch (error) {
+        return false;
+    }
+}
+
 /**
  * Check if user is authenticated
  */
@@ -63,6 +105,7 @@ function getCurrentUser() {
  */
 function logout() {
     localStorage.removeItem('token');
+    localStorage.removeItem('refreshToken');
     localStorage.removeItem('user');
     window.location.href = 'index.html';
 }
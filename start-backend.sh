@@ -51,4 +51,4 @@ fi
 echo "🚀 Starting FastAPI server on http://localhost:8000"
 echo "📚 API documentation available at http://localhost:8000/docs"
 echo ""
-python main.py
+RELOAD=true python main.py